@@ -28,6 +28,63 @@ def create_app():
     if not app.config["MONGO_DB_NAME"]:
         raise RuntimeError("MONGO_DB_NAME not set")
 
+    # One pooled MongoClient per worker process
+    app.config["MONGO_MAX_POOL_SIZE"] = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+    app.config["MONGO_MIN_POOL_SIZE"] = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    app.config["MONGO_MAX_IDLE_TIME_MS"] = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    app.config["MONGO_WAIT_QUEUE_TIMEOUT_MS"] = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"] = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # Create missing / drop retired managed indexes at startup (default: only via `flask mongo-indexes`)
+    app.config["MONGO_ENSURE_INDEXES"] = os.getenv("MONGO_ENSURE_INDEXES", "false").strip().lower() in ("1", "true", "yes")
+    # Otherwise only warn about missing indexes at startup, waiting at most this long for MongoDB (0 disables)
+    app.config["MONGO_INDEX_CHECK_TIMEOUT_MS"] = int(os.getenv("MONGO_INDEX_CHECK_TIMEOUT_MS", "1000"))
+
+    # Intent encoder micro-batching (0 ms disables batching)
+    app.config["INTENT_BATCH_WINDOW_MS"] = float(os.getenv("INTENT_BATCH_WINDOW_MS", "5"))
+    app.config["INTENT_BATCH_MAX_SIZE"] = int(os.getenv("INTENT_BATCH_MAX_SIZE", "16"))
+
+    # Normalized-text intent cache (0 disables it)
+    app.config["INTENT_CACHE_SIZE"] = int(os.getenv("INTENT_CACHE_SIZE", "2048"))
+    app.config["INTENT_CACHE_TTL_SECONDS"] = float(os.getenv("INTENT_CACHE_TTL_SECONDS", "3600"))
+
+    # Intent scoring: nearest (default), centroid or knn
+    app.config["INTENT_SCORING_MODE"] = os.getenv("INTENT_SCORING_MODE", "nearest").strip().lower()
+    app.config["INTENT_KNN_K"] = int(os.getenv("INTENT_KNN_K", "5"))
+
+    # Nearest-neighbour search: "exact" or "hnsw" (needs hnswlib). Indexes with
+    # fewer than INTENT_ANN_MIN_ROWS rows are always searched exactly.
+    app.config["INTENT_ANN_BACKEND"] = os.getenv("INTENT_ANN_BACKEND", "exact").strip().lower()
+    app.config["INTENT_ANN_MIN_ROWS"] = int(os.getenv("INTENT_ANN_MIN_ROWS", "20000"))
+    app.config["INTENT_ANN_EF_SEARCH"] = int(os.getenv("INTENT_ANN_EF_SEARCH", "64"))
+
+    # How often each worker re-checks an org's custom intent examples
+    app.config["INTENT_ORG_REFRESH_SECONDS"] = float(os.getenv("INTENT_ORG_REFRESH_SECONDS", "30"))
+
+    # Context retention for low-confidence turns: "embedding" mixes the cached
+    # previous-turn embedding; "reparse" re-encodes "previous\nmessage" from Mongo history.
+    app.config["CHAT_CONTEXT_MODE"] = os.getenv("CHAT_CONTEXT_MODE", "embedding").strip().lower()
+    app.config["CHAT_CONTEXT_CACHE_SIZE"] = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", "10000"))
+    app.config["CHAT_CONTEXT_TTL_SECONDS"] = float(os.getenv("CHAT_CONTEXT_TTL_SECONDS", "1800"))
+
+    # Resolved chatbot templates / quick replies / company profiles are reloaded from the DB at most this often
+    app.config["TEMPLATE_CACHE_REFRESH_SECONDS"] = float(os.getenv("TEMPLATE_CACHE_REFRESH_SECONDS", "300"))
+    app.config["QUICK_REPLY_CACHE_REFRESH_SECONDS"] = float(os.getenv("QUICK_REPLY_CACHE_REFRESH_SECONDS", "300"))
+    app.config["COMPANY_PROFILE_CACHE_TTL_SECONDS"] = float(os.getenv("COMPANY_PROFILE_CACHE_TTL_SECONDS", "300"))
+
+    # Write-behind chat message persistence (unordered insert_many from a worker thread).
+    # CHAT_WRITE_OVERFLOW: "spill" writes synchronously when the queue is full, "drop" discards.
+    app.config["CHAT_WRITE_BEHIND"] = os.getenv("CHAT_WRITE_BEHIND", "true").strip().lower() in ("1", "true", "yes")
+    app.config["CHAT_WRITE_QUEUE_SIZE"] = int(os.getenv("CHAT_WRITE_QUEUE_SIZE", "10000"))
+    app.config["CHAT_WRITE_BATCH_SIZE"] = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "100"))
+    app.config["CHAT_WRITE_FLUSH_MS"] = float(os.getenv("CHAT_WRITE_FLUSH_MS", "50"))
+    app.config["CHAT_WRITE_OVERFLOW"] = os.getenv("CHAT_WRITE_OVERFLOW", "spill").strip().lower()
+
+    # chatMessages -> analytics rollup: run every N seconds in each worker (0: CLI only),
+    # leaving messages younger than the settle window for the next run.
+    app.config["ANALYTICS_ROLLUP_INTERVAL_SECONDS"] = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "300"))
+    app.config["ANALYTICS_ROLLUP_BATCH_SIZE"] = int(os.getenv("ANALYTICS_ROLLUP_BATCH_SIZE", "5000"))
+    app.config["ANALYTICS_ROLLUP_SETTLE_SECONDS"] = float(os.getenv("ANALYTICS_ROLLUP_SETTLE_SECONDS", "120"))
+
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "pool_pre_ping": True,
         "pool_size": 2,
@@ -35,6 +92,18 @@ def create_app():
     }
 
     db.init_app(app)
+
+    from backend.infrastructure.mongodb.mongo_client import MongoClientManager
+    from backend.infrastructure.mongodb.indexes import init_indexes
+    mongo = MongoClientManager(app)
+    init_indexes(app, mongo)
+
+    from backend.application.ai.chatbot_registry import ChatbotServiceRegistry
+    ChatbotServiceRegistry(app)
+
+    from backend.application.analytics_rollup import init_rollups
+    init_rollups(app, mongo)
+
     CORS(
         app,
         resources={
@@ -0,0 +1,101 @@
+# Compares approximate (HNSW) intent search against the exact dot product at
+# large example counts: recall@k, top-1 intent agreement and per-query latency.
+#
+#   python -m backend.application.ai.benchmark_ann --rows 200000 --ef 32 64 128
+#
+# Rows are synthesised by jittering the current intent index (or random
+# clusters when no index exists), so the numbers reflect the real embedding
+# geometry without needing an encoder. Requires hnswlib.
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.application.ai import intent_store
+from backend.application.ai.intent_ann import ExactSearch, HnswSearch
+from backend.application.ai.intent_scoring import score_nearest
+from backend.application.ai.intent_store import IntentIndex
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def _base_rows(rng, dim: int):
+    version = intent_store.current_version()
+    if version:
+        index = intent_store.open_index(version)
+        print(f"Jittering intent index {version} ({len(index)} rows)")
+        return index.dense(), index.labels
+
+    print("No intent index found; using random clusters")
+    centers = _normalize(rng.standard_normal((64, dim)).astype(np.float32))
+    return centers, [f"intent_{i}" for i in range(len(centers))]
+
+
+def _jitter(rng, base: np.ndarray, labels, n: int, noise: float):
+    picks = rng.integers(0, len(base), size=n)
+    rows = base[picks] + noise * rng.standard_normal((n, base.shape[1])).astype(np.float32)
+    return _normalize(rows).astype(np.float32), [labels[i] for i in picks]
+
+
+def _percentiles(latencies) -> str:
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return f"p50={p50:.3f}ms p95={p95:.3f}ms p99={p99:.3f}ms"
+
+
+def _run(searcher, queries, k):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(searcher.search(q, k))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN vs exact intent search.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.02, help="per-dimension jitter stddev")
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 64, 128], help="ef_search values to try")
+    parser.add_argument("--dim", type=int, default=384, help="dimension for random clusters")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base, base_labels = _base_rows(rng, args.dim)
+    rows, labels = _jitter(rng, base, base_labels, args.rows, args.noise)
+    queries, _ = _jitter(rng, base, base_labels, args.queries, args.noise)
+
+    index = IntentIndex(embeddings=rows, labels=labels, version="benchmark")
+    exact_results, exact_latencies = _run(ExactSearch(index), queries, args.k)
+    exact_intents = [score_nearest(sims, [labels[i] for i in ids])[0] for ids, sims in exact_results]
+    print(f"exact        rows={args.rows} {_percentiles(exact_latencies)}")
+
+    start = time.perf_counter()
+    hnsw = HnswSearch.build(rows)
+    print(f"hnsw build   {time.perf_counter() - start:.1f}s")
+
+    for ef in args.ef:
+        hnsw.graph.set_ef(ef)
+        results, latencies = _run(hnsw, queries, args.k)
+
+        recall = np.mean([
+            len(set(ids.tolist()) & set(exact_ids.tolist())) / len(exact_ids)
+            for (ids, _), (exact_ids, _) in zip(results, exact_results)
+        ])
+        agreement = np.mean([
+            score_nearest(sims, [labels[i] for i in ids])[0] == intent
+            for (ids, sims), intent in zip(results, exact_intents)
+        ])
+        print(
+            f"hnsw ef={ef:<4} recall@{args.k}={recall:.4f} "
+            f"top1-intent-agreement={agreement:.4f} {_percentiles(latencies)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import logging
+import threading
+
+from flask import current_app
+
+from backend import db
+from backend.application.ai.chatbot_service import ChatbotService
+from backend.application.ai.intent_cache import IntentCache
+from backend.application.ai.intent_service_embed import EmbeddingIntentService, encode_texts
+from backend.application.ai.org_intent_index import OrgIntentIndexes
+from backend.application.ai.template_engine import TemplateEngine
+from backend.application.chat_service import ChatMessageService
+from backend.data_access.ai.chat_context_repo import ChatContext, ChatContextRepository
+from backend.data_access.ai.company_profile_repo import CompanyProfileRepository
+from backend.data_access.ai.template_repo import TemplateRepository
+from backend.data_access.ai.quick_reply_repo import QuickReplyRepository
+from backend.data_access.ai.intent_example_repo import IntentExampleRepository
+from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
+from backend.infrastructure.mongodb.message_writer import ChatMessageWriter
+from backend.infrastructure.mongodb.mongo_client import EXTENSION_KEY as MONGO_EXTENSION_KEY
+
+EXTENSION_KEY = "chatbot_registry"
+
+logger = logging.getLogger(__name__)
+
+
+class ChatbotServiceRegistry:
+    """
+    App-scoped holder for the chatbot collaborators.
+
+    Repositories, the template engine, the intent service and the
+    ChatbotService itself are stateless (or guard their own state), so one
+    instance per worker is shared by all request threads. They are built
+    lazily on first request, i.e. after gunicorn forks, so workers do not pay
+    the cost at import time and never share the master's Mongo client.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._components = None
+        self.app = None
+        self.mongo = None
+        self.config = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.config = app.config
+        self.mongo = app.extensions[MONGO_EXTENSION_KEY]
+        app.extensions[EXTENSION_KEY] = self
+
+    def _build_components(self) -> dict:
+        company_repository = CompanyProfileRepository(
+            ttl_seconds=self.config.get("COMPANY_PROFILE_CACHE_TTL_SECONDS", 300.0),
+        )
+        return {
+            "intent_service": EmbeddingIntentService(
+                batch_window_ms=self.config.get("INTENT_BATCH_WINDOW_MS", 0.0),
+                max_batch_size=self.config.get("INTENT_BATCH_MAX_SIZE", 16),
+                cache_size=self.config.get("INTENT_CACHE_SIZE", 2048),
+                cache_ttl_seconds=self.config.get("INTENT_CACHE_TTL_SECONDS", 3600.0),
+                scoring_mode=self.config.get("INTENT_SCORING_MODE", "nearest"),
+                knn_k=self.config.get("INTENT_KNN_K", 5),
+                ann_backend=self.config.get("INTENT_ANN_BACKEND", "exact"),
+                ann_min_rows=self.config.get("INTENT_ANN_MIN_ROWS", 20000),
+                ann_ef_search=self.config.get("INTENT_ANN_EF_SEARCH", 64),
+                org_indexes=OrgIntentIndexes(
+                    IntentExampleRepository(),
+                    refresh_seconds=self.config.get("INTENT_ORG_REFRESH_SECONDS", 30.0),
+                    encode_texts=encode_texts,
+                ),
+            ),
+            "company_repository": company_repository,
+            "context_repository": ChatContextRepository(
+                company_repository,
+                ttl_seconds=self.config.get("COMPANY_PROFILE_CACHE_TTL_SECONDS", 300.0),
+            ),
+            "template_repository": TemplateRepository(
+                refresh_seconds=self.config.get("TEMPLATE_CACHE_REFRESH_SECONDS", 300.0),
+            ),
+            "template_engine": TemplateEngine(),
+            "quick_reply_repository": QuickReplyRepository(
+                refresh_seconds=self.config.get("QUICK_REPLY_CACHE_REFRESH_SECONDS", 300.0),
+            ),
+            "message_writer": self._build_message_writer(),
+            # (organisation_id, session_id) -> previous user turn, for context retention.
+            "session_context": IntentCache(
+                max_size=self.config.get("CHAT_CONTEXT_CACHE_SIZE", 10000),
+                ttl_seconds=self.config.get("CHAT_CONTEXT_TTL_SECONDS", 1800.0),
+            ),
+        }
+
+    def _build_chatbot_service(self, components: dict) -> ChatbotService:
+        return ChatbotService(
+            intent_service=components["intent_service"],
+            context_repository=components["context_repository"],
+            template_repository=components["template_repository"],
+            template_engine=components["template_engine"],
+            chat_message_service=ChatMessageService(
+                ChatMessageRepository(self.mongo.db, writer=components["message_writer"])
+            ),
+            quick_reply_repository=components["quick_reply_repository"],
+            session_context=components["session_context"],
+            context_mode=self.config.get("CHAT_CONTEXT_MODE", "embedding"),
+        )
+
+    def _build_message_writer(self) -> ChatMessageWriter | None:
+        if not self.config.get("CHAT_WRITE_BEHIND", True):
+            return None
+        return ChatMessageWriter(
+            get_collection=self._messages_collection,
+            max_queue=self.config.get("CHAT_WRITE_QUEUE_SIZE", 10000),
+            batch_size=self.config.get("CHAT_WRITE_BATCH_SIZE", 100),
+            flush_interval_ms=self.config.get("CHAT_WRITE_FLUSH_MS", 50.0),
+            overflow=self.config.get("CHAT_WRITE_OVERFLOW", "spill"),
+        )
+
+    def _messages_collection(self):
+        # Shares the worker's pooled client; the writer thread needs no app context.
+        return self.mongo.db.chatMessages
+
+    @property
+    def components(self) -> dict:
+        if self._components is None:
+            with self._lock:
+                if self._components is None:
+                    components = self._build_components()
+                    components["chatbot_service"] = self._build_chatbot_service(components)
+                    self._warm_up(components)
+                    self._components = components
+        return self._components
+
+    def _warm_up(self, components: dict) -> None:
+        # Resolve training examples and every known quick-reply text in the
+        # background so button clicks are answered from the exact-match table;
+        # until it is seeded, messages go through the encoder as usual.
+        quick_replies = components["quick_reply_repository"]
+
+        def load_texts():
+            with self.app.app_context():
+                return quick_replies.get_all_texts()
+
+        components["intent_service"].warm_up_async(load_texts)
+
+    def refresh_org_intents(self, organisation_id: int) -> int:
+        """
+        Called after an org edits its intent examples; encodes only new texts.
+        On failure returns 0; the saved rows are retried when the org index is next loaded.
+        """
+        try:
+            return self.components["intent_service"].update_organisation_examples(organisation_id)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to encode intent examples for org %s", organisation_id)
+            return 0
+
+    def refresh_quick_replies(self, texts: list[str]) -> None:
+        """Called after an org edits its quick replies."""
+        self.components["quick_reply_repository"].invalidate()
+        try:
+            self.components["intent_service"].seed_texts(texts)
+        except Exception:
+            logger.exception("Failed to seed intents for updated quick replies")
+
+    def refresh_templates(self) -> None:
+        """Called after chatbot_template rows are edited."""
+        self.components["template_repository"].invalidate()
+
+    def invalidate_organisation(self, organisation_id: int) -> None:
+        """Called after an org's profile or chatbot settings are edited."""
+        self.components["company_repository"].invalidate(organisation_id)
+        self.components["context_repository"].invalidate(organisation_id)
+
+    def chat_context(self, organisation_id: int | str | None) -> ChatContext | None:
+        return self.components["context_repository"].get(organisation_id)
+
+    def runtime_stats(self) -> dict:
+        writer = self.components["message_writer"]
+        return {
+            "chat_writer": writer.stats() if writer else None,
+            "intent_cache": self.components["intent_service"].cache.stats(),
+            "session_context": self.components["session_context"].stats(),
+            "mongo_pool": self.mongo.stats(),
+        }
+
+    @property
+    def company_repository(self) -> CompanyProfileRepository:
+        return self.components["company_repository"]
+
+    def chatbot_service(self) -> ChatbotService:
+        return self.components["chatbot_service"]
+
+
+def get_registry() -> ChatbotServiceRegistry:
+    return current_app.extensions[EXTENSION_KEY]
+
+
+def get_chatbot_service() -> ChatbotService:
+    return get_registry().chatbot_service()
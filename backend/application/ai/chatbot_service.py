@@ -1,26 +1,36 @@
 from typing import Any, Dict, List, Optional
 import re
+import time
+
+from backend.application.ai.intent_cache import normalize_text
+from backend.data_access.ai.chat_context_repo import ChatContext
+
+# Below this confidence the previous user turn is used as context.
+CONTEXT_CONFIDENCE_THRESHOLD = 0.45
 
 class ChatbotService:
     def __init__(
         self,
         intent_service,
-        company_repository,
+        context_repository,
         template_repository,
         template_engine,
-        chatbot_repository=None,
-        personality_repository=None,
         chat_message_service=None, 
         quick_reply_repository=None,
+        session_context=None,
+        context_mode: str = "reparse",
     ):
         self.intent_service = intent_service
-        self.company_repository = company_repository
+        # Org profile + chatbot settings + personality, loaded together and cached per org.
+        self.context_repository = context_repository
         self.template_repository = template_repository
         self.template_engine = template_engine
-        self.chatbot_repository = chatbot_repository
-        self.personality_repository = personality_repository
         self.chat_message_service = chat_message_service
         self.quick_reply_repository = quick_reply_repository
+        # "embedding": mix the cached previous-turn embedding (no encoder call, no Mongo);
+        # "reparse": re-parse "previous\nmessage" from session history.
+        self.session_context = session_context
+        self.context_mode = context_mode
 
     # CHAT
     def chat(
@@ -29,59 +39,67 @@ class ChatbotService:
         message: str,
         session_id: Optional[str] = None,
         user_id: Optional[int] = None,
+        context: Optional[ChatContext] = None,
     ) -> Dict[str, Any]:
 
-        intent_result = self.intent_service.parse(message)
-        intent = intent_result.get("intent", "fallback")
-        confidence = float(intent_result.get("confidence", 0.0))
-        entities = intent_result.get("entities", [])
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
 
-        company = self.company_repository.get_company_profile(company_id)
+        use_embedding_context = bool(
+            self.context_mode == "embedding"
+            and session_id
+            and self.session_context is not None
+            and hasattr(self.intent_service, "parse_in_context")
+        )
 
-        chatbot = (
-            self.chatbot_repository.get_by_organisation_id(company_id)
-            if self.chatbot_repository
-            else None
+        intent_result = self.intent_service.parse(
+            message,
+            organisation_id=company_id,
+            include_embedding=use_embedding_context,
         )
+        intent = intent_result.get("intent", "fallback")
+        confidence = float(intent_result.get("confidence", 0.0))
+        entities = intent_result.get("entities", [])
+        mark = self._lap(timings, "intent", started)
 
-        personality = None
-        if chatbot and chatbot.personality_id and self.personality_repository:
-            personality = self.personality_repository.get_by_id(chatbot.personality_id)
+        if context is None:
+            context = self.context_repository.get(company_id)
+        company = context.company if context else None
+        chatbot = context.chatbot if context else None
+        personality_name = context.personality_name if context else None
 
-        # Lightweight context retention: if the current message is ambiguous, try re-parsing with the
+        # Lightweight context retention: if the current message is ambiguous, try again with the
         # previous user message as context.
-        if (
-            (intent == "fallback" or confidence < 0.45)
-            and session_id
-            and chatbot
-            and chatbot.bot_id
-            and self.chat_message_service
-            and hasattr(self.chat_message_service, "get_session_messages")
-        ):
+        ctx_result = None
+        if intent == "fallback" or confidence < CONTEXT_CONFIDENCE_THRESHOLD:
             try:
-                history = self.chat_message_service.get_session_messages(
-                    organisation_id=int(company_id),
-                    chatbot_id=int(chatbot.bot_id),
-                    session_id=session_id,
-                    limit=12,
-                )
-                prev_user = None
-                for m in reversed(history or []):
-                    if getattr(m, "sender", None) == "user" and (getattr(m, "message", "") or "").strip():
-                        prev_user = (getattr(m, "message", "") or "").strip()
-                        break
-
-                if prev_user and prev_user.strip().lower() != (message or "").strip().lower():
-                    ctx_result = self.intent_service.parse(f"{prev_user}\n{message}")
-                    ctx_intent = ctx_result.get("intent", "fallback")
-                    ctx_conf = float(ctx_result.get("confidence", 0.0))
-                    if ctx_intent != "fallback" and ctx_conf >= 0.45 and ctx_conf >= (confidence + 0.05):
-                        intent = ctx_intent
-                        confidence = ctx_conf
-                        entities = ctx_result.get("entities", [])
+                if use_embedding_context:
+                    ctx_result = self._context_from_session_cache(company_id, session_id, message, intent_result)
+                # Cache miss (new worker, expired entry) falls back to the history re-parse.
+                if ctx_result is None:
+                    ctx_result = self._context_from_history(company_id, session_id, message, chatbot)
             except Exception:
                 # Never fail the chat call due to context logic.
-                pass
+                ctx_result = None
+
+        if ctx_result:
+            ctx_intent = ctx_result.get("intent", "fallback")
+            ctx_conf = float(ctx_result.get("confidence", 0.0))
+            if (
+                ctx_intent != "fallback"
+                and ctx_conf >= CONTEXT_CONFIDENCE_THRESHOLD
+                and ctx_conf >= (confidence + 0.05)
+            ):
+                intent = ctx_intent
+                confidence = ctx_conf
+                entities = ctx_result.get("entities", [])
+
+        if use_embedding_context and intent_result.get("embedding") is not None:
+            self.session_context.put(
+                (str(company_id), session_id),
+                {"text": normalize_text(message), "embedding": intent_result["embedding"]},
+            )
+        mark = self._lap(timings, "context", mark)
 
         industry = (company or {}).get("industry", "default")
 
@@ -118,6 +136,7 @@ class ChatbotService:
                 intent=intent,
                 language=reply_language,
             )
+        mark = self._lap(timings, "template", mark)
 
         reply = self.template_engine.render(
             template=template,
@@ -142,8 +161,8 @@ class ChatbotService:
             used_custom_welcome = True
 
         # If the org provided a custom greeting, use it "as written" (no personality wrapping).
-        if personality and not used_custom_welcome:
-            reply = self._apply_personality(reply, personality.name, reply_language, intent=intent)
+        if personality_name and not used_custom_welcome:
+            reply = self._apply_personality(reply, personality_name, reply_language, intent=intent)
 
         # If the org provided a custom greeting, do not auto-add emojis; only strip if disallowed.
         if chatbot and chatbot.allow_emojis is False:
@@ -151,7 +170,11 @@ class ChatbotService:
         elif chatbot and chatbot.allow_emojis is True and not used_custom_welcome:
             reply = self._ensure_emoji(reply)
 
+        mark = self._lap(timings, "render", mark)
+
         quick_replies = self._quick_replies_for(company_id, industry, intent, reply_language)
+        # Quick replies are resolved from the same cached tables as the template.
+        mark = self._lap(timings, "template", mark)
 
         # Persist USER message
         self._save_chat_message(
@@ -162,9 +185,12 @@ class ChatbotService:
             sender_user_id=user_id,
             message=message,
             intent=intent,
+            confidence=confidence,
         )
+        self._lap(timings, "persist", mark)
+        timings["total"] = round((time.perf_counter() - started) * 1000, 2)
 
-        # Persist BOT reply
+        # Persist BOT reply, carrying the turn's stage timings
         self._save_chat_message(
             organisation_id=company_id,
             chatbot_id=chatbot.bot_id if chatbot else None,
@@ -173,6 +199,7 @@ class ChatbotService:
             sender_user_id=None,
             message=reply,
             intent=intent,
+            timings=timings,
         )
 
         return {
@@ -192,19 +219,14 @@ class ChatbotService:
         self,
         company_id: str | int,
         session_id: Optional[str] = None,
+        context: Optional[ChatContext] = None,
     ) -> Dict[str, Any]:
 
-        company = self.company_repository.get_company_profile(company_id)
-
-        chatbot = (
-            self.chatbot_repository.get_by_organisation_id(company_id)
-            if self.chatbot_repository
-            else None
-        )
-
-        personality = None
-        if chatbot and chatbot.personality_id and self.personality_repository:
-            personality = self.personality_repository.get_by_id(chatbot.personality_id)
+        if context is None:
+            context = self.context_repository.get(company_id)
+        company = context.company if context else None
+        chatbot = context.chatbot if context else None
+        personality_name = context.personality_name if context else None
 
         industry = (company or {}).get("industry", "default")
 
@@ -237,8 +259,8 @@ class ChatbotService:
 
         # Apply personality using English language
         # If the org provided a custom greeting, use it "as written" (no personality wrapping).
-        if personality and not used_custom_welcome:
-            reply = self._apply_personality(reply, personality.name, language, intent="greet")
+        if personality_name and not used_custom_welcome:
+            reply = self._apply_personality(reply, personality_name, language, intent="greet")
 
         # Emoji toggle
         # If the org provided a custom greeting, do not auto-add emojis; only strip if disallowed.
@@ -275,6 +297,13 @@ class ChatbotService:
         }
 
     # HELPERS
+    @staticmethod
+    def _lap(timings: Dict[str, float], stage: str, since: float) -> float:
+        """Adds the ms elapsed since `since` to `stage`; returns now for the next stage."""
+        now = time.perf_counter()
+        timings[stage] = round(timings.get(stage, 0.0) + (now - since) * 1000, 2)
+        return now
+
     def _save_chat_message(
         self,
         organisation_id: str | int,
@@ -284,6 +313,8 @@ class ChatbotService:
         sender_user_id: Optional[int],
         message: str,
         intent: Optional[str],
+        timings: Optional[Dict[str, float]] = None,
+        confidence: Optional[float] = None,
     ) -> None:
         if not self.chat_message_service:
             return
@@ -299,6 +330,64 @@ class ChatbotService:
             sender_user_id=sender_user_id,
             message=message or "",
             intent=intent,
+            confidence=confidence,
+            timings=timings,
+        )
+
+    def _context_from_session_cache(
+        self,
+        company_id: str | int,
+        session_id: str,
+        message: str,
+        intent_result: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        previous = self.session_context.get((str(company_id), session_id))
+        if not previous or intent_result.get("embedding") is None:
+            return None
+        if previous["text"] == normalize_text(message):
+            # Repeated message: no new context, and nothing to gain from the history path.
+            return {}
+
+        return self.intent_service.parse_in_context(
+            intent_result["embedding"],
+            previous["embedding"],
+            organisation_id=company_id,
+        )
+
+    def _context_from_history(
+        self,
+        company_id: str | int,
+        session_id: Optional[str],
+        message: str,
+        chatbot,
+    ) -> Optional[Dict[str, Any]]:
+        if not (
+            session_id
+            and chatbot
+            and chatbot.bot_id
+            and self.chat_message_service
+            and hasattr(self.chat_message_service, "get_session_messages")
+        ):
+            return None
+
+        history = self.chat_message_service.get_session_messages(
+            organisation_id=int(company_id),
+            chatbot_id=int(chatbot.bot_id),
+            session_id=session_id,
+            limit=12,
+        )
+        prev_user = None
+        for m in reversed(history or []):
+            if getattr(m, "sender", None) == "user" and (getattr(m, "message", "") or "").strip():
+                prev_user = (getattr(m, "message", "") or "").strip()
+                break
+
+        if not prev_user or prev_user.strip().lower() == (message or "").strip().lower():
+            return None
+
+        return self.intent_service.parse(
+            f"{prev_user}\n{message}",
+            organisation_id=company_id,
         )
 
     def _quick_replies_for(self, company_id: str | int, industry: str, intent: str, language: str) -> List[str]:
@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    In-process micro-batcher for sentence embeddings.
+
+    Request threads call `encode(text)`; the text is queued and a single worker
+    thread waits up to `window_ms` for more texts (or until `max_batch_size` is
+    reached), runs one batched forward pass and resolves each caller's future
+    with its own row.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], np.ndarray],
+        window_ms: float = 5.0,
+        max_batch_size: int = 16,
+    ):
+        self.encode_batch = encode_batch
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork, so a gunicorn worker forked from a preloaded
+        # master must start its own batching thread.
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(
+                target=self._run,
+                name="embedding-batcher",
+                daemon=True,
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _collect(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            pending = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+
+            try:
+                embeddings = self.encode_batch([text for text, _ in pending])
+            except Exception as e:
+                for _, fut in pending:
+                    fut.set_exception(e)
+                continue
+
+            for row, (_, fut) in zip(embeddings, pending):
+                fut.set_result(row)
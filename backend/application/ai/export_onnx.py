@@ -0,0 +1,93 @@
+# Exports the intent encoder to ONNX (optionally int8-quantized) and checks that it
+# picks the same intent as the PyTorch encoder on INTENT_EXAMPLES.
+#
+#   python -m backend.application.ai.export_onnx --quantize --verify
+#
+# Requires `optimum[onnxruntime]` on the machine doing the export and on workers
+# started with INTENT_ENCODER_BACKEND=onnx / onnx-int8.
+
+import argparse
+import sys
+
+import numpy as np
+from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+from backend.application.ai.intent_model import build_training_data
+from backend.application.ai.intent_service_embed import (
+    MODEL_NAME,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZATION,
+    encode_texts,
+    load_encoder,
+)
+
+
+def export(quantize: bool, qconfig: str) -> None:
+    print(f"Exporting {MODEL_NAME} to ONNX...")
+    model = SentenceTransformer(MODEL_NAME, backend="onnx")
+    model.save_pretrained(str(ONNX_MODEL_DIR))
+    print(f"ONNX model saved to: {ONNX_MODEL_DIR}")
+
+    if quantize:
+        print(f"Quantizing to int8 ({qconfig})...")
+        export_dynamic_quantized_onnx_model(
+            model,
+            quantization_config=qconfig,
+            model_name_or_path=str(ONNX_MODEL_DIR),
+        )
+        print("Quantized model saved.")
+
+
+def _leave_one_out_predictions(queries: np.ndarray, index: np.ndarray, labels: list[str]) -> list[str]:
+    # Each example is also in the index; mask its own row so the check measures
+    # how the encoder ranks the *other* examples rather than a trivial self-match.
+    sims = queries @ index.T
+    np.fill_diagonal(sims, -np.inf)
+    return [labels[i] for i in sims.argmax(axis=1)]
+
+
+def verify(backend: str, qconfig: str, min_agreement: float) -> bool:
+    texts, labels = build_training_data()
+
+    print("Encoding examples with the PyTorch encoder...")
+    reference = encode_texts(texts, model=load_encoder("torch"))
+
+    print(f"Encoding examples with the {backend} encoder...")
+    candidate = encode_texts(texts, model=load_encoder(backend, qconfig=qconfig))
+
+    ref_pred = _leave_one_out_predictions(reference, reference, labels)
+    cand_pred = _leave_one_out_predictions(candidate, reference, labels)
+
+    agreement = sum(a == b for a, b in zip(ref_pred, cand_pred)) / len(texts)
+    cosine = float(np.mean(np.sum(reference * candidate, axis=1)))
+
+    print(f"Examples: {len(texts)}")
+    print(f"Top-1 intent agreement: {agreement:.4f} (required >= {min_agreement:.4f})")
+    print(f"Mean cosine(torch, {backend}): {cosine:.4f}")
+
+    return agreement >= min_agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify the ONNX intent encoder.")
+    parser.add_argument("--skip-export", action="store_true", help="only verify an existing export")
+    parser.add_argument("--quantize", action="store_true", help="also write a dynamic int8 model")
+    parser.add_argument("--qconfig", default=ONNX_QUANTIZATION, help="arm64, avx2, avx512 or avx512_vnni")
+    parser.add_argument("--verify", action="store_true", help="compare top-1 intents against PyTorch")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if not args.skip_export:
+        export(args.quantize, args.qconfig)
+
+    if args.verify:
+        backends = ["onnx", "onnx-int8"] if args.quantize else ["onnx"]
+        results = [verify(backend, args.qconfig, args.min_agreement) for backend in backends]
+        if not all(results):
+            print("Verification FAILED.")
+            sys.exit(1)
+        print("Verification passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Nearest-neighbour search backends for intent matching:
+#   exact - dense dot product over every row (default)
+#   hnsw  - approximate HNSW graph via hnswlib; sub-linear in rows, recall set by ef_search
+ANN_BACKENDS = ("exact", "hnsw")
+
+
+class ExactSearch:
+    """Brute-force top-k over an IntentIndex; the reference the ANN backends are measured against."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def search(self, query_emb: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        sims = self.index.similarities(query_emb)
+        k = max(1, min(int(k), len(sims)))
+        top = np.argpartition(-sims, k - 1)[:k]
+        return top, sims[top]
+
+
+class HnswSearch:
+    """
+    HNSW graph over unit-length embeddings using inner-product space, so the
+    returned scores are the same cosine similarities the exact path produces.
+    """
+
+    def __init__(self, graph, ef_search: int = 64):
+        self.graph = graph
+        self.graph.set_ef(ef_search)
+
+    @staticmethod
+    def _hnswlib():
+        try:
+            import hnswlib
+        except ImportError as exc:
+            raise RuntimeError("INTENT_ANN_BACKEND=hnsw requires hnswlib (pip install hnswlib).") from exc
+        return hnswlib
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        ef_construction: int = 200,
+        m: int = 16,
+        ef_search: int = 64,
+    ) -> "HnswSearch":
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        graph = cls._hnswlib().Index(space="ip", dim=embeddings.shape[1])
+        graph.init_index(max_elements=len(embeddings), ef_construction=ef_construction, M=m)
+        graph.add_items(embeddings, np.arange(len(embeddings)))
+        return cls(graph, ef_search)
+
+    @classmethod
+    def load(cls, path: Path, dim: int, ef_search: int = 64) -> "HnswSearch":
+        graph = cls._hnswlib().Index(space="ip", dim=dim)
+        graph.load_index(str(path))
+        return cls(graph, ef_search)
+
+    def __len__(self) -> int:
+        return self.graph.get_current_count()
+
+    def save(self, path: Path) -> None:
+        self.graph.save_index(str(path))
+
+    def search(self, query_emb: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = max(1, min(int(k), len(self)))
+        ids, distances = self.graph.knn_query(np.asarray(query_emb, dtype=np.float32), k=k)
+        # hnswlib's "ip" distance is 1 - dot product.
+        return ids[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+
+def build_searcher(
+    index,
+    backend: str = "exact",
+    min_rows: int = 0,
+    ef_search: int = 64,
+    graph_path: Optional[Path] = None,
+):
+    """
+    Picks the search structure for an IntentIndex. Indexes smaller than
+    `min_rows` always use exact search; a graph saved at `graph_path` (written
+    by precompute_intents.py --ann) is loaded instead of rebuilt.
+    """
+    if backend not in ANN_BACKENDS:
+        raise ValueError(f"ANN backend must be one of {ANN_BACKENDS}")
+
+    if backend == "exact" or len(index) < min_rows:
+        return ExactSearch(index)
+
+    if graph_path is not None and graph_path.exists():
+        searcher = HnswSearch.load(graph_path, index.embeddings.shape[1], ef_search=ef_search)
+        if len(searcher) == len(index):
+            return searcher
+
+    return HnswSearch.build(index.dense(), ef_search=ef_search)
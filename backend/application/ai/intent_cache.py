@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def normalize_text(text: str | None) -> str:
+    """Case-folds and collapses whitespace so "  Opening   Hours" == "opening hours"."""
+    return " ".join((text or "").casefold().split())
+
+
+class IntentCache:
+    """
+    Bounded LRU cache with a TTL for intent parse results.
+
+    Entries are tagged with the version of the intent index they were computed
+    against; when the index version changes the whole cache is dropped, so a
+    regenerated intent_embeddings.npy never serves stale intents.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl_seconds: float = 3600.0):
+        self.max_size = max(int(max_size), 0)
+        self.ttl_seconds = float(ttl_seconds)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._version: Any = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _sync_version(self, version: Any) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sync_version(version)
+
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expires_at, entry = item
+            if self.ttl_seconds > 0 and expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: Dict[str, Any], version: Any = None) -> None:
+        if self.max_size == 0:
+            return
+
+        with self._lock:
+            self._sync_version(version)
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class IntentLookupTable:
+    """
+    Exact-match table of pre-resolved intents (training examples and quick-reply
+    button texts), keyed by normalized text.
+
+    Lookups are a single dict access and never touch the encoder. The table is
+    swapped wholesale on writes so readers never need the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.version: Any = None
+        self.hits = 0
+
+    def get(self, key: str, version: Any = None) -> Optional[Dict[str, Any]]:
+        if version != self.version:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def replace(self, entries: Dict[str, Dict[str, Any]], version: Any) -> None:
+        with self._lock:
+            self._entries = dict(entries)
+            self.version = version
+
+    def update(self, entries: Dict[str, Dict[str, Any]], version: Any) -> None:
+        with self._lock:
+            # Entries resolved against an older index are dropped; the next full
+            # reseed for the new version picks the texts up again.
+            if version != self.version:
+                return
+            merged = dict(self._entries)
+            merged.update(entries)
+            self._entries = merged
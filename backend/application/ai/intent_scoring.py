@@ -0,0 +1,108 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Scoring modes for EmbeddingIntentService:
+#   nearest  - argmax cosine over every training example (raw cosine confidence)
+#   centroid - best per-intent prototype, O(#intents * prototypes)
+#   knn      - similarity-weighted vote among the top-k nearest examples
+SCORING_MODES = ("nearest", "centroid", "knn")
+
+
+def margin_confidence(best_similarity: float, best_score: float, runner_up_score: float) -> float:
+    """
+    Discounts the winning similarity by how contested the decision was: an
+    uncontested winner keeps its full similarity, a dead heat keeps half.
+    """
+    if best_score <= 0:
+        return 0.0
+    margin = max(best_score - max(runner_up_score, 0.0), 0.0) / best_score
+    return float(best_similarity * (0.5 + 0.5 * margin))
+
+
+def score_nearest(sims: np.ndarray, labels: List[str]) -> Tuple[str, float]:
+    best_idx = int(np.argmax(sims))
+    return labels[best_idx], float(sims[best_idx])
+
+
+def score_knn(sims: np.ndarray, labels: List[str], k: int = 5) -> Tuple[str, float]:
+    k = max(1, min(int(k), len(sims)))
+    top = np.argpartition(-sims, k - 1)[:k]
+
+    votes: dict[str, float] = {}
+    best_sim: dict[str, float] = {}
+    for idx in top:
+        label = labels[int(idx)]
+        sim = float(sims[idx])
+        votes[label] = votes.get(label, 0.0) + max(sim, 0.0)
+        best_sim[label] = max(best_sim.get(label, -1.0), sim)
+
+    ranked = sorted(votes, key=lambda label: (votes[label], best_sim[label]), reverse=True)
+    winner = ranked[0]
+    runner_up = votes[ranked[1]] if len(ranked) > 1 else 0.0
+
+    return winner, margin_confidence(best_sim[winner], votes[winner], runner_up)
+
+
+def score_centroid(
+    query_emb: np.ndarray,
+    prototypes: np.ndarray,
+    prototype_labels: List[str],
+) -> Tuple[str, float]:
+    sims = prototypes @ query_emb
+
+    per_intent: dict[str, float] = {}
+    for label, sim in zip(prototype_labels, sims):
+        sim = float(sim)
+        if sim > per_intent.get(label, -1.0):
+            per_intent[label] = sim
+
+    ranked = sorted(per_intent, key=per_intent.get, reverse=True)
+    winner = ranked[0]
+    runner_up = per_intent[ranked[1]] if len(ranked) > 1 else 0.0
+
+    return winner, margin_confidence(per_intent[winner], per_intent[winner], runner_up)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def build_prototypes(
+    embeddings: np.ndarray,
+    labels: List[str],
+    per_intent: int = 1,
+    iterations: int = 10,
+    seed: int = 42,
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Builds `per_intent` unit-length prototypes for each intent. One prototype is
+    the normalized centroid; more than one runs a small spherical k-means over
+    that intent's examples.
+    """
+    rng = np.random.default_rng(seed)
+    labels_arr = np.asarray(labels)
+
+    prototypes = []
+    prototype_labels = []
+    for intent in dict.fromkeys(labels):
+        members = np.asarray(embeddings[labels_arr == intent], dtype=np.float32)
+        k = max(1, min(int(per_intent), len(members)))
+
+        if k == 1:
+            centers = _normalize_rows(members.mean(axis=0, keepdims=True))
+        else:
+            centers = members[rng.choice(len(members), size=k, replace=False)]
+            for _ in range(iterations):
+                assign = (members @ centers.T).argmax(axis=1)
+                for c in range(k):
+                    assigned = members[assign == c]
+                    if len(assigned):
+                        centers[c] = assigned.mean(axis=0)
+                centers = _normalize_rows(centers)
+
+        prototypes.append(centers)
+        prototype_labels.extend([intent] * len(centers))
+
+    return np.vstack(prototypes).astype(np.float32), prototype_labels
@@ -1,54 +1,455 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable
+
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from pathlib import Path
 
+from backend.application.ai.embedding_batcher import EmbeddingBatcher
+from backend.application.ai.intent_ann import ANN_BACKENDS, build_searcher
+from backend.application.ai.intent_cache import IntentCache, IntentLookupTable, normalize_text
+from backend.application.ai.intent_scoring import (
+    SCORING_MODES,
+    build_prototypes,
+    score_centroid,
+    score_knn,
+    score_nearest,
+)
+from backend.application.ai.intent_training_data import INTENT_EXAMPLES
+from backend.application.ai import intent_store
+from backend.application.ai.intent_store import IntentIndex
+from backend.application.ai.org_intent_index import OrgIntentIndex, OrgIntentIndexes
+
+logger = logging.getLogger(__name__)
+
 BASE_DIR = Path(__file__).parent
 EMB_PATH = BASE_DIR / "intent_embeddings.npy"
 LBL_PATH = BASE_DIR / "intent_labels.npy"
 
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Encoder backend: "torch" (default), "onnx" or "onnx-int8".
+# The ONNX variants load the export written by `python -m backend.application.ai.export_onnx`.
+ENCODER_BACKEND = os.getenv("INTENT_ENCODER_BACKEND", "torch").strip().lower()
+ONNX_MODEL_DIR = Path(os.getenv("INTENT_ONNX_MODEL_DIR", str(BASE_DIR / "models" / "minilm-onnx")))
+ONNX_FILE_NAME = "onnx/model.onnx"
+ONNX_INT8_FILE_NAME = "onnx/model_qint8_{qconfig}.onnx"
+ONNX_QUANTIZATION = os.getenv("INTENT_ONNX_QUANTIZATION", "avx2")
+
+# How often each worker re-reads the index version (CURRENT pointer or legacy file
+# stat); a swapped index is picked up within this many seconds.
+INDEX_CHECK_SECONDS = float(os.getenv("INTENT_INDEX_CHECK_SECONDS", "5"))
+
+# Back-off before a failed lookup-table rebuild is tried again.
+LOOKUP_REBUILD_RETRY_SECONDS = 30.0
+# Largest batch handed to the encoder; bulk seeding is split into batches of this size.
+ENCODE_MAX_BATCH_SIZE = 64
+
 _model = None
-_intent_embeddings = None
-_intent_labels = None
+_intent_index = None
+_index_checked_at = 0.0
+_prototypes = None
+
+
+def load_encoder(backend: str = "torch", qconfig: str = ONNX_QUANTIZATION) -> SentenceTransformer:
+    if backend == "torch":
+        return SentenceTransformer(MODEL_NAME)
+
+    if backend not in ("onnx", "onnx-int8"):
+        raise RuntimeError(f"Unknown INTENT_ENCODER_BACKEND '{backend}'.")
+
+    file_name = (
+        ONNX_INT8_FILE_NAME.format(qconfig=qconfig)
+        if backend == "onnx-int8"
+        else ONNX_FILE_NAME
+    )
+    if not (ONNX_MODEL_DIR / file_name).exists():
+        raise RuntimeError(
+            f"ONNX intent encoder not found at {ONNX_MODEL_DIR / file_name}. "
+            "Run `python -m backend.application.ai.export_onnx` to export it."
+        )
+
+    return SentenceTransformer(
+        str(ONNX_MODEL_DIR),
+        backend="onnx",
+        model_kwargs={"file_name": file_name},
+    )
 
 
 def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer(
-            "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-        )
+        _model = load_encoder(ENCODER_BACKEND)
     return _model
 
 
+def _file_version(path: Path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _current_index_version():
+    # Prefer the versioned store written by precompute_intents.py; fall back to the
+    # legacy intent_embeddings.npy, versioned by its mtime and size.
+    return intent_store.current_version() or _file_version(EMB_PATH)
+
+
+def load_intent_index() -> IntentIndex:
+    global _intent_index, _index_checked_at
+
+    # Within INDEX_CHECK_SECONDS of the last check the loaded index is used as is,
+    # keeping filesystem I/O off the per-message path.
+    now = time.monotonic()
+    if _intent_index is not None and now - _index_checked_at < INDEX_CHECK_SECONDS:
+        return _intent_index
+    _index_checked_at = now
+
+    # Reloads when the index is regenerated; the version also keys the intent cache.
+    version = _current_index_version()
+    if _intent_index is None or _intent_index.version != version:
+        if isinstance(version, str):
+            _intent_index = intent_store.open_index(version)
+        else:
+            _intent_index = IntentIndex(
+                embeddings=np.load(EMB_PATH, mmap_mode="r"),
+                labels=np.load(LBL_PATH).tolist(),
+                version=version,
+            )
+
+    return _intent_index
+
+
+def load_prototypes():
+    """
+    Per-intent prototypes written by precompute_intents.py. Falls back to
+    centroids computed from the loaded index when none were stored or they
+    were written for a different label set.
+    """
+    global _prototypes
+
+    index = load_intent_index()
+    if _prototypes is not None and _prototypes[0] == index.version:
+        return _prototypes[1], _prototypes[2]
+
+    prototypes, prototype_labels = index.prototypes, index.prototype_labels
+    if prototypes is None or set(prototype_labels) != set(index.labels):
+        prototypes, prototype_labels = build_prototypes(index.dense(), index.labels)
+
+    _prototypes = (index.version, prototypes, prototype_labels)
+    return prototypes, prototype_labels
+
+
 def get_intent_data():
-    global _intent_embeddings, _intent_labels
+    index = load_intent_index()
+    return index.dense(), index.labels
 
-    if _intent_embeddings is None:
-        _intent_embeddings = np.load(EMB_PATH)
-        _intent_labels = np.load(LBL_PATH).tolist()
 
-    return _intent_embeddings, _intent_labels
+def encode_texts(texts: list[str], model: SentenceTransformer | None = None) -> np.ndarray:
+    return (model or get_model()).encode(
+        texts,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        batch_size=min(max(len(texts), 1), ENCODE_MAX_BATCH_SIZE),
+    )
 
 
 class EmbeddingIntentService:
-    def parse(self, message: str) -> dict:
+    def __init__(
+        self,
+        batch_window_ms: float = 0.0,
+        max_batch_size: int = 16,
+        cache_size: int = 2048,
+        cache_ttl_seconds: float = 3600.0,
+        scoring_mode: str = "nearest",
+        knn_k: int = 5,
+        org_indexes: OrgIntentIndexes | None = None,
+        ann_backend: str = "exact",
+        ann_min_rows: int = 20000,
+        ann_ef_search: int = 64,
+    ):
+        if scoring_mode not in SCORING_MODES:
+            raise ValueError(f"scoring_mode must be one of {SCORING_MODES}")
+        if ann_backend not in ANN_BACKENDS:
+            raise ValueError(f"ann_backend must be one of {ANN_BACKENDS}")
+        self.scoring_mode = scoring_mode
+        self.knn_k = knn_k
+        self.org_indexes = org_indexes
+
+        # Indexes below ann_min_rows always use exact search.
+        self.ann_backend = ann_backend
+        self.ann_min_rows = ann_min_rows
+        self.ann_ef_search = ann_ef_search
+        self._ann_lock = threading.Lock()
+
+        # A zero window disables micro-batching and encodes on the calling thread.
+        self.batcher = (
+            EmbeddingBatcher(encode_texts, window_ms=batch_window_ms, max_batch_size=max_batch_size)
+            if batch_window_ms > 0
+            else None
+        )
+        self.cache = IntentCache(max_size=cache_size, ttl_seconds=cache_ttl_seconds)
+        self.lookup = IntentLookupTable()
+        self._seed_lock = threading.Lock()
+        self._seed_texts: set[str] = set()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self._rebuild_not_before = 0.0
+        # Loads the quick-reply texts to seed with; cleared once they are in the table.
+        self._seed_loader: Callable[[], Iterable[str]] | None = None
+
+    def encode(self, message: str) -> np.ndarray:
+        if self.batcher:
+            return self.batcher.encode(message)
+        return encode_texts([message])[0]
+
+    def parse(
+        self,
+        message: str,
+        organisation_id: int | str | None = None,
+        include_embedding: bool = False,
+    ) -> dict:
         if not message or not message.strip():
             return {"intent": "fallback", "confidence": 0.0, "entities": []}
 
-        model = get_model()
-        intent_embeddings, intent_labels = get_intent_data()
+        version = (load_intent_index().version, self.scoring_mode)
 
-        query_emb = model.encode(
-            [message],
-            normalize_embeddings=True,
-            convert_to_numpy=True,
-        )[0]
+        if self.lookup.version != version:
+            self._rebuild_lookup_async()
 
-        sims = intent_embeddings @ query_emb   # cleaner than np.dot
-        best_idx = int(np.argmax(sims))
+        key = normalize_text(message)
+        org_index = self._org_index(organisation_id)
 
-        return {
-            "intent": intent_labels[best_idx],
-            "confidence": float(sims[best_idx]),
+        if org_index is None:
+            cached = self._resolve(key, message, version)
+        else:
+            cached = self._resolve_for_org(org_index, key, message, version)
+
+        result = {
+            "intent": cached["intent"],
+            "confidence": cached["confidence"],
             "entities": [],
-        }
\ No newline at end of file
+        }
+        if include_embedding:
+            result["embedding"] = cached["embedding"]
+        return result
+
+    def parse_in_context(
+        self,
+        message_emb: np.ndarray,
+        previous_emb: np.ndarray,
+        organisation_id: int | str | None = None,
+        previous_weight: float = 1.0,
+    ) -> dict:
+        """
+        Scores the message together with the previous user turn by mixing their
+        embeddings, approximating a parse of "previous\nmessage" without a
+        second encoder call.
+        """
+        combined = previous_weight * np.asarray(previous_emb, dtype=np.float32) + message_emb
+        combined = combined / max(float(np.linalg.norm(combined)), 1e-12)
+
+        intent, confidence = self.score(combined.astype(np.float32), self._org_index(organisation_id))
+        return {"intent": intent, "confidence": confidence, "entities": []}
+
+    def _org_index(self, organisation_id) -> OrgIntentIndex | None:
+        if not self.org_indexes or not organisation_id:
+            return None
+        return self.org_indexes.get(organisation_id)
+
+    def _resolve(self, key: str, message: str, version) -> dict:
+        # While the table is rebuilt for a new index, the previous one keeps answering.
+        cached = self.lookup.get(key, version=self.lookup.version) or self.cache.get(key, version=version)
+        if cached is None:
+            query_emb = self.encode(message)
+            intent, confidence = self.score(query_emb)
+
+            cached = {
+                "intent": intent,
+                "confidence": confidence,
+                "embedding": query_emb,
+            }
+            self.cache.put(key, cached, version=version)
+        return cached
+
+    def _resolve_for_org(self, org_index: OrgIntentIndex, key: str, message: str, version) -> dict:
+        org_key = (org_index.version, key)
+        cached = self.cache.get(org_key, version=version)
+        if cached is not None:
+            return cached
+
+        idx = org_index.exact.get(key)
+        if idx is not None:
+            cached = {
+                "intent": org_index.labels[idx],
+                "confidence": 1.0,
+                "embedding": org_index.row(idx),
+            }
+        else:
+            # Reuse the global embedding (lookup/cache/encoder) and rescore it
+            # against the global and org examples together.
+            query_emb = self._resolve(key, message, version)["embedding"]
+            intent, confidence = self.score(query_emb, org_index)
+            cached = {
+                "intent": intent,
+                "confidence": confidence,
+                "embedding": query_emb,
+            }
+
+        self.cache.put(org_key, cached, version=version)
+        return cached
+
+    def score(self, query_emb: np.ndarray, org_index: IntentIndex | None = None) -> tuple[str, float]:
+        if self.scoring_mode == "centroid":
+            prototypes, prototype_labels = load_prototypes()
+            if org_index is not None:
+                # Each org example acts as an extra prototype for its intent.
+                prototypes = np.vstack([prototypes, org_index.dense()])
+                prototype_labels = prototype_labels + org_index.labels
+            return score_centroid(query_emb, prototypes, prototype_labels)
+
+        # Only the top-k rows matter for nearest/knn, so both go through the
+        # index's searcher (exact or ANN) rather than a full similarity vector.
+        k = self.knn_k if self.scoring_mode == "knn" else 1
+
+        index = load_intent_index()
+        ids, sims = self._searcher(index).search(query_emb, k)
+        labels = [index.labels[i] for i in ids]
+        if org_index is not None:
+            org_ids, org_sims = self._searcher(org_index).search(query_emb, k)
+            sims = np.concatenate([sims, org_sims])
+            labels = labels + [org_index.labels[i] for i in org_ids]
+
+        if self.scoring_mode == "knn":
+            return score_knn(sims, labels, k=k)
+        return score_nearest(sims, labels)
+
+    def _searcher(self, index: IntentIndex):
+        searcher = index.searcher
+        if searcher is None:
+            with self._ann_lock:
+                if index.searcher is None:
+                    index.searcher = build_searcher(
+                        index,
+                        backend=self.ann_backend,
+                        min_rows=self.ann_min_rows,
+                        ef_search=self.ann_ef_search,
+                        graph_path=index.path / intent_store.ANN_FILE if index.path else None,
+                    )
+                searcher = index.searcher
+        return searcher
+
+    def update_organisation_examples(self, organisation_id: int) -> int:
+        """Encodes the org's new/edited examples; returns how many were encoded."""
+        if not self.org_indexes:
+            return 0
+        return self.org_indexes.encode_pending(organisation_id, encode_texts)
+
+    # WARM-UP
+    def warm_up(self, texts: Iterable[str] = ()) -> int:
+        """
+        Rebuilds the exact-match lookup table for the current intent index:
+        every INTENT_EXAMPLES utterance with its labelled intent, plus every
+        registered quick-reply text resolved once through the classifier.
+        Returns the number of entries in the table.
+        """
+        index = load_intent_index()
+        version = (index.version, self.scoring_mode)
+        texts = [t for t in texts if normalize_text(t)]
+
+        with self._seed_lock:
+            self._seed_texts.update(texts)
+            if self.lookup.version == version and not texts:
+                return len(self.lookup)
+
+            table = self._example_entries(index)
+            table.update(self._resolve_texts(self._seed_texts, table))
+            self.lookup.replace(table, version)
+
+        logger.info("Intent lookup table seeded with %d entries", len(table))
+        return len(table)
+
+    def warm_up_async(self, load_texts: Callable[[], Iterable[str]] | None = None) -> None:
+        """warm_up on a background thread; `load_texts` is called there, not by the caller."""
+        self._seed_loader = load_texts
+        self._rebuild_lookup_async()
+
+    def _rebuild_lookup_async(self) -> None:
+        """Starts one background warm_up (first seeding or after an index swap); callers never wait on it."""
+        with self._rebuild_lock:
+            if self._rebuilding or time.monotonic() < self._rebuild_not_before:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_lookup, name="intent-lookup-rebuild", daemon=True).start()
+
+    def _rebuild_lookup(self) -> None:
+        try:
+            loader = self._seed_loader
+            self.warm_up(loader() if loader else ())
+            if self._seed_loader is loader:
+                self._seed_loader = None
+        except Exception:
+            logger.exception("Intent lookup rebuild failed; retrying in %ss", LOOKUP_REBUILD_RETRY_SECONDS)
+            self._rebuild_not_before = time.monotonic() + LOOKUP_REBUILD_RETRY_SECONDS
+        finally:
+            with self._rebuild_lock:
+                self._rebuilding = False
+
+    def seed_texts(self, texts: Iterable[str]) -> None:
+        """Adds quick-reply texts to the lookup table without rebuilding it."""
+        version = (load_intent_index().version, self.scoring_mode)
+
+        with self._seed_lock:
+            texts = [t for t in texts if normalize_text(t)]
+            self._seed_texts.update(texts)
+            if self.lookup.version != version:
+                return
+            self.lookup.update(
+                self._resolve_texts(texts, self.lookup),
+                version,
+            )
+
+    def _example_entries(self, index: IntentIndex) -> dict:
+        texts = index.texts
+        if texts is None:
+            # Legacy indexes carry no texts; rows only line up with INTENT_EXAMPLES if
+            # the index was generated from this exact training data.
+            texts = [ex for examples in INTENT_EXAMPLES.values() for ex in examples]
+            labels = [intent for intent, examples in INTENT_EXAMPLES.items() for _ in examples]
+            if labels != list(index.labels):
+                logger.warning("Intent index is out of date with INTENT_EXAMPLES; skipping example seeding")
+                return {}
+
+        entries = {}
+        for i, (text, intent) in enumerate(zip(texts, index.labels)):
+            key = normalize_text(text)
+            if key and key not in entries:
+                entries[key] = {
+                    "intent": intent,
+                    "confidence": 1.0,
+                    "embedding": index.row(i),
+                }
+        return entries
+
+    def _resolve_texts(self, texts, known) -> dict:
+        pending = {}
+        for text in texts:
+            key = normalize_text(text)
+            if key not in known:
+                pending.setdefault(key, text)
+        if not pending:
+            return {}
+
+        embeddings = encode_texts(list(pending.values()))
+
+        entries = {}
+        for key, emb in zip(pending, embeddings):
+            intent, confidence = self.score(emb)
+            entries[key] = {
+                "intent": intent,
+                "confidence": confidence,
+                "embedding": emb,
+            }
+        return entries
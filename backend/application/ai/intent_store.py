@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+STORE_DIR = Path(os.getenv("INTENT_STORE_DIR", str(BASE_DIR / "intent_index")))
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 3
+ANN_FILE = "hnsw.bin"
+
+STORE_DTYPES = ("float16", "int8", "float32")
+# Rows upcast at a time when scoring a float16/int8 matrix (~6 MB of float32 at 384 dims).
+SIMILARITY_BLOCK_ROWS = 4096
+
+
+class IntentIndex:
+    """
+    A loaded intent embedding matrix plus its labels.
+
+    `embeddings` may be a read-only memory map of float16/float32 rows, or int8
+    rows with one scale per row. Callers go through `similarities`/`row`/`dense`
+    so they never need to know which.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        labels: List[str],
+        version,
+        scales: Optional[np.ndarray] = None,
+        texts: Optional[List[str]] = None,
+        prototypes: Optional[np.ndarray] = None,
+        prototype_labels: Optional[List[str]] = None,
+        path: Optional[Path] = None,
+    ):
+        self.embeddings = embeddings
+        self.labels = labels
+        self.version = version
+        self.scales = scales
+        self.texts = texts
+        self.prototypes = prototypes
+        self.prototype_labels = prototype_labels
+        self.path = path
+        # Search structure over the rows; built lazily by the intent service.
+        self.searcher = None
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def similarities(self, query_emb: np.ndarray) -> np.ndarray:
+        query_emb = np.asarray(query_emb, dtype=np.float32)
+        if self.embeddings.dtype == np.float32:
+            sims = self.embeddings @ query_emb
+        else:
+            # Upcast a block of rows at a time into a small scratch buffer; a
+            # whole-matrix product would copy the mapped rows to float32 per query.
+            rows = len(self.embeddings)
+            sims = np.empty(rows, dtype=np.float32)
+            block = np.empty((min(rows, SIMILARITY_BLOCK_ROWS), self.embeddings.shape[1]), dtype=np.float32)
+            for start in range(0, rows, SIMILARITY_BLOCK_ROWS):
+                chunk = self.embeddings[start:start + SIMILARITY_BLOCK_ROWS]
+                buf = block[:len(chunk)]
+                np.copyto(buf, chunk)
+                np.matmul(buf, query_emb, out=sims[start:start + len(chunk)])
+        if self.scales is not None:
+            sims *= self.scales
+        return sims
+
+    def row(self, idx: int) -> np.ndarray:
+        vec = np.asarray(self.embeddings[idx], dtype=np.float32)
+        if self.scales is not None:
+            vec = vec * self.scales[idx]
+        return vec
+
+    def dense(self) -> np.ndarray:
+        matrix = np.asarray(self.embeddings, dtype=np.float32)
+        if self.scales is not None:
+            matrix = matrix * self.scales[:, None]
+        return matrix
+
+
+def _quantize_int8(embeddings: np.ndarray):
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return quantized, scales
+
+
+def write_index(
+    embeddings: np.ndarray,
+    labels: List[str],
+    texts: Optional[List[str]] = None,
+    dtype: str = "float16",
+    prototypes: Optional[np.ndarray] = None,
+    prototype_labels: Optional[List[str]] = None,
+    ann_index=None,
+    store_dir: Path = STORE_DIR,
+) -> str:
+    """
+    Writes a new immutable index version and atomically points CURRENT at it.
+    Workers that already mapped the previous version keep reading it until
+    they notice the switch.
+    """
+    if dtype not in STORE_DTYPES:
+        raise ValueError(f"dtype must be one of {STORE_DTYPES}")
+
+    # Nanosecond timestamps keep versions unique and lexically ordered.
+    version = f"v{time.time_ns()}"
+    version_dir = store_dir / version
+    version_dir.mkdir(parents=True)
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "int8":
+        quantized, scales = _quantize_int8(embeddings)
+        np.save(version_dir / "embeddings.npy", quantized)
+        np.save(version_dir / "scales.npy", scales)
+    else:
+        np.save(version_dir / "embeddings.npy", embeddings.astype(dtype))
+
+    np.save(version_dir / "labels.npy", np.array(labels))
+    if texts is not None:
+        np.save(version_dir / "texts.npy", np.array(texts))
+    if prototypes is not None and prototype_labels is not None:
+        np.save(version_dir / "prototypes.npy", np.asarray(prototypes, dtype=np.float32))
+        np.save(version_dir / "prototype_labels.npy", np.array(prototype_labels))
+    if ann_index is not None:
+        ann_index.save(version_dir / ANN_FILE)
+
+    with open(version_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump({"version": version, "dtype": dtype, "rows": len(labels)}, f)
+
+    tmp = store_dir / f"{CURRENT_FILE}.tmp"
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, store_dir / CURRENT_FILE)
+
+    _prune_versions(store_dir, keep=version)
+    return version
+
+
+def _prune_versions(store_dir: Path, keep: str) -> None:
+    versions = sorted(p for p in store_dir.iterdir() if p.is_dir())
+    stale = [p for p in versions[:-KEEP_VERSIONS] if p.name != keep]
+    for path in stale:
+        # Unlinking a mapped file is safe on POSIX; old readers keep their pages.
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def current_version(store_dir: Path = STORE_DIR) -> Optional[str]:
+    try:
+        return (store_dir / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def open_index(version: str, store_dir: Path = STORE_DIR) -> IntentIndex:
+    version_dir = store_dir / version
+
+    def _optional(name: str, **kwargs):
+        path = version_dir / name
+        return np.load(path, **kwargs) if path.exists() else None
+
+    texts = _optional("texts.npy")
+    prototype_labels = _optional("prototype_labels.npy")
+
+    return IntentIndex(
+        # mmap_mode="r" lets every gunicorn worker share the same page-cache copy.
+        embeddings=np.load(version_dir / "embeddings.npy", mmap_mode="r"),
+        labels=np.load(version_dir / "labels.npy").tolist(),
+        version=version,
+        scales=_optional("scales.npy"),
+        texts=texts.tolist() if texts is not None else None,
+        prototypes=_optional("prototypes.npy", mmap_mode="r"),
+        prototype_labels=prototype_labels.tolist() if prototype_labels is not None else None,
+        path=version_dir,
+    )
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from backend.application.ai.intent_cache import normalize_text
+from backend.application.ai.intent_store import IntentIndex
+from backend import db
+from backend.data_access.ai.intent_example_repo import IntentExampleRepository
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DTYPE = np.float16
+
+
+class OrgIntentIndex(IntentIndex):
+    """An org's example index plus an exact-text map for verbatim matches."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exact = {normalize_text(t): i for i, t in enumerate(self.texts or [])}
+
+
+class OrgIntentIndexes:
+    """
+    Per-organisation intent indexes built from ChatbotIntentExample rows.
+
+    Embeddings live on the rows, so building an index is a single SELECT and
+    never touches the encoder; only rows whose embedding is still NULL are
+    encoded, by `encode_pending` after an org-admin edit. If that failed, the
+    rows are retried (with `encode_texts`) the next time the index is built.
+    Each worker checks an org's change marker at most once every
+    `refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        repository: IntentExampleRepository,
+        refresh_seconds: float = 30.0,
+        encode_texts: Optional[Callable] = None,
+    ):
+        self.repository = repository
+        self.refresh_seconds = refresh_seconds
+        self.encode_texts = encode_texts
+
+        self._lock = threading.Lock()
+        # organisation_id -> (db version, checked_at, IntentIndex | None)
+        self._indexes: dict[int, tuple] = {}
+
+    def get(self, organisation_id: int | str | None) -> Optional[OrgIntentIndex]:
+        try:
+            org_id = int(organisation_id)
+        except (TypeError, ValueError):
+            return None
+
+        entry = self._indexes.get(org_id)
+        now = time.monotonic()
+        if entry and now - entry[1] < self.refresh_seconds:
+            return entry[2]
+
+        version = self.repository.get_version(org_id)
+        if entry and entry[0] == version:
+            index = entry[2]
+        else:
+            index = self._build(org_id, version)
+
+        with self._lock:
+            self._indexes[org_id] = (version, now, index)
+        return index
+
+    def _build(self, org_id: int, version) -> Optional[OrgIntentIndex]:
+        rows = self.repository.list_by_organisation(org_id)
+        unencoded = [r for r in rows if not r.embedding]
+        if unencoded and self.encode_texts is not None:
+            try:
+                self._encode(unencoded, self.encode_texts)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Encoding %d pending intent examples for org %s failed", len(unencoded), org_id)
+
+        rows = [r for r in rows if r.embedding]
+        if not rows:
+            return None
+
+        return OrgIntentIndex(
+            embeddings=np.vstack([np.frombuffer(r.embedding, dtype=EMBEDDING_DTYPE) for r in rows]),
+            labels=[r.intent for r in rows],
+            version=("org", org_id, version),
+            texts=[r.text for r in rows],
+        )
+
+    def encode_pending(self, organisation_id: int, encode_texts: Callable) -> int:
+        """Encodes only the org's new or edited examples, then drops the cached index."""
+        rows = self.repository.get_unencoded(organisation_id)
+        try:
+            if rows:
+                self._encode(rows, encode_texts)
+        finally:
+            self.invalidate(organisation_id)
+        return len(rows)
+
+    def _encode(self, rows: list, encode_texts: Callable) -> None:
+        embeddings = encode_texts([r.text for r in rows])
+        self.repository.save_embeddings(
+            rows,
+            [np.asarray(e, dtype=EMBEDDING_DTYPE).tobytes() for e in embeddings],
+        )
+
+    def invalidate(self, organisation_id: int) -> None:
+        with self._lock:
+            self._indexes.pop(int(organisation_id), None)
@@ -1,12 +1,22 @@
 # file to be run everytime when the training data changes.
 
-import numpy as np
+import argparse
+
 from sentence_transformers import SentenceTransformer
 from intent_training_data import INTENT_EXAMPLES
+from intent_scoring import build_prototypes
+from intent_store import STORE_DTYPES, write_index
+from intent_ann import HnswSearch
 
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 
 def main():
+    parser = argparse.ArgumentParser(description="Precompute intent embeddings and prototypes.")
+    parser.add_argument("--prototypes", type=int, default=1, help="prototypes per intent (1 = centroid)")
+    parser.add_argument("--dtype", choices=STORE_DTYPES, default="float16", help="stored matrix precision")
+    parser.add_argument("--ann", action="store_true", help="also build and save an HNSW graph (needs hnswlib)")
+    args = parser.parse_args()
+
     print("Loading model...")
     model = SentenceTransformer(MODEL_NAME)
 
@@ -26,10 +36,26 @@ def main():
         batch_size=8,
     )
 
-    np.save("intent_embeddings.npy", embeddings)
-    np.save("intent_labels.npy", np.array(labels))
+    print(f"Building {args.prototypes} prototype(s) per intent...")
+    prototypes, prototype_labels = build_prototypes(embeddings, labels, per_intent=args.prototypes)
+
+    ann_index = None
+    if args.ann:
+        print("Building HNSW graph...")
+        ann_index = HnswSearch.build(embeddings)
+
+    # Written as a new version under intent_index/; running workers pick it up on their next parse.
+    version = write_index(
+        embeddings,
+        labels,
+        texts=texts,
+        dtype=args.dtype,
+        prototypes=prototypes,
+        prototype_labels=prototype_labels,
+        ann_index=ann_index,
+    )
 
-    print("Embeddings saved successfully.")
+    print(f"Embeddings saved successfully ({args.dtype}, version {version}).")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import re
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple
 
 
 class TemplateEngine:
@@ -15,6 +16,15 @@ class TemplateEngine:
 
     VARIABLE_PATTERN = re.compile(r"\{\{\s*(.*?)\s*\}\}")
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def compile(template: str) -> Tuple[str, ...]:
+        """
+        Splits a template once into alternating parts: even indexes are literal
+        text, odd indexes are variable names. Cached by template text.
+        """
+        return tuple(TemplateEngine.VARIABLE_PATTERN.split(template))
+
     def render(self, template: str, company: Dict[str, Any], entities: List[Dict[str, Any]]):
         if not template:
             return "Sorry, I don't have an answer for that yet."
@@ -22,19 +32,27 @@ class TemplateEngine:
         if not company:
             return template
 
-        def replace_var(match):
-            key = match.group(1)
-
-            # Replace from company profile
-            if key in company and company[key] is not None:
-                return str(company[key])
+        parts = self.compile(template)
+        if len(parts) == 1:
+            return template
 
-            # Replace from extracted entities (future use)
-            for entity in entities:
-                if entity.get("entity") == key:
-                    return str(entity.get("value"))
+        # Extracted entities (future use); the first entity for a name wins.
+        entity_values: Dict[str, Any] = {}
+        for entity in entities or []:
+            entity_values.setdefault(entity.get("entity"), entity.get("value"))
 
-            # Fallback if missing
-            return f"<{key}>"
+        out = list(parts)
+        for i in range(1, len(parts), 2):
+            key = parts[i]
 
-        return self.VARIABLE_PATTERN.sub(replace_var, template)
\ No newline at end of file
+            # Replace from company profile
+            value = company.get(key)
+            if value is not None:
+                out[i] = str(value)
+            elif key in entity_values:
+                out[i] = str(entity_values[key])
+            else:
+                # Fallback if missing
+                out[i] = f"<{key}>"
+
+        return "".join(out)
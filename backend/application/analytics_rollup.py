@@ -0,0 +1,358 @@
+# Incremental rollup of chatMessages into the `analytics` table: one row per
+# bot per UTC day with message counts, per-hour user-message counts, intent
+# counts, HyperLogLog sketches of distinct users and sessions, and histograms
+# of the reply latency recorded on bot messages. Platform-wide totals per day
+# (all messages, including bots no longer in SQL) go to `platform_usage_day`.
+#
+# Messages are folded in `_id` order behind a watermark, so each one is counted
+# exactly once. Each batch runs in a single SQL transaction holding a pg
+# advisory lock: concurrent runners (one per gunicorn worker, or the CLI) skip
+# instead of double counting, and the watermark only advances with the rows.
+#
+#   flask --app backend.run analytics-rollup
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import click
+from bson import ObjectId
+
+from backend import db
+from backend.application.hyperloglog import HyperLogLog
+from backend.application.latency_histogram import LatencySummary
+from backend.data_access.Analytics.analytics import PLATFORM_ROLLUP_NAME, AnalyticsRepository
+from backend.models import Analytics, PlatformUsageDay
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_KEY = "analytics_rollup"
+
+PROJECTION = {
+    "chatbotId": 1,
+    "sender": 1,
+    "sessionId": 1,
+    "senderUserId": 1,
+    "timestamp": 1,
+    "metadata.intent": 1,
+    "metadata.confidence": 1,
+    "metadata.timings": 1,
+}
+
+# Intent confidence is stored as a histogram so any low-confidence threshold
+# (on a 1 / CONFIDENCE_BINS grid) can be applied when reading.
+CONFIDENCE_BINS = 20
+
+
+def confidence_bin(confidence: float) -> int:
+    return min(max(int(confidence * CONFIDENCE_BINS), 0), CONFIDENCE_BINS - 1)
+
+
+def load_hourly(row: Analytics) -> list[int]:
+    return json.loads(row.hourly_counts) if row.hourly_counts else [0] * 24
+
+
+def load_intents(row: Analytics) -> Counter:
+    return Counter(json.loads(row.top_intents) if row.top_intents else {})
+
+
+def load_confidence(row: Analytics) -> list[int]:
+    return json.loads(row.confidence_histogram) if row.confidence_histogram else [0] * CONFIDENCE_BINS
+
+
+class DayRollup:
+    """Counts for one (bot, day) accumulated from a batch of messages."""
+
+    __slots__ = ("total", "user", "hourly", "intents", "confidence", "users", "sessions", "latency")
+
+    def __init__(self):
+        self.total = 0
+        self.user = 0
+        self.hourly = [0] * 24
+        self.intents = Counter()
+        self.confidence = [0] * CONFIDENCE_BINS
+        self.users = HyperLogLog()
+        self.sessions = HyperLogLog()
+        self.latency = LatencySummary()
+
+    def add(self, doc: dict) -> None:
+        self.total += 1
+        metadata = doc.get("metadata") or {}
+        if doc.get("sender") != "user":
+            if metadata.get("timings"):
+                self.latency.add(metadata["timings"], metadata.get("intent"))
+            return
+
+        self.user += 1
+        self.hourly[doc["timestamp"].hour] += 1
+        intent = metadata.get("intent")
+        if intent:
+            self.intents[intent] += 1
+        if isinstance(metadata.get("confidence"), (int, float)):
+            self.confidence[confidence_bin(metadata["confidence"])] += 1
+        if doc.get("senderUserId"):
+            self.users.add(doc["senderUserId"])
+        if doc.get("sessionId"):
+            self.sessions.add(doc["sessionId"])
+
+    def apply_to(self, row: Analytics) -> None:
+        row.total_messages = (row.total_messages or 0) + self.total
+        row.user_messages = (row.user_messages or 0) + self.user
+
+        hourly = [a + b for a, b in zip(load_hourly(row), self.hourly)]
+        row.hourly_counts = json.dumps(hourly)
+        row.peak_hour = max(range(24), key=hourly.__getitem__) if any(hourly) else None
+
+        intents = load_intents(row) + self.intents
+        row.top_intents = json.dumps(dict(intents.most_common()))
+        row.confidence_histogram = json.dumps([a + b for a, b in zip(load_confidence(row), self.confidence)])
+
+        row.user_sketch = self.users.merge(HyperLogLog.from_bytes(row.user_sketch)).to_bytes()
+        row.session_sketch = self.sessions.merge(HyperLogLog.from_bytes(row.session_sketch)).to_bytes()
+
+        if self.latency.count:
+            latency = self.latency.merge(LatencySummary.from_json(row.latency_histogram))
+            row.latency_histogram = latency.to_json()
+            row.avg_response_time = latency.avg_ms
+
+
+class PlatformDayRollup:
+    """Platform-wide message count and session sketch for one day."""
+
+    __slots__ = ("messages", "sessions")
+
+    def __init__(self):
+        self.messages = 0
+        self.sessions = HyperLogLog()
+
+    def add(self, doc: dict) -> None:
+        self.messages += 1
+        if doc.get("sessionId"):
+            self.sessions.add(doc["sessionId"])
+
+    def apply_to(self, row: PlatformUsageDay) -> None:
+        row.messages = (row.messages or 0) + self.messages
+        sketch = self.sessions.merge(HyperLogLog.from_bytes(row.session_sketch))
+        row.session_sketch = sketch.to_bytes()
+        row.sessions = sketch.count()
+
+
+class AnalyticsRollupService:
+
+    def __init__(
+        self,
+        collection,
+        repo: AnalyticsRepository | None = None,
+        batch_size: int = 5000,
+        settle_seconds: float = 120.0,
+    ):
+        self.collection = collection
+        self.repo = repo or AnalyticsRepository()
+        self.batch_size = max(int(batch_size), 1)
+        # Messages younger than this are left for the next run: write-behind
+        # inserts can land slightly out of _id order.
+        self.settle_seconds = settle_seconds
+
+    def run(self, max_batches: int | None = None) -> dict:
+        """Folds in messages until caught up (or locked out). Returns counters."""
+        result = {"batches": 0, "messages": 0, "skipped": 0, "locked": False}
+        while max_batches is None or result["batches"] < max_batches:
+            batch = self._run_batch()
+            if batch is None:
+                result["locked"] = True
+                break
+            processed, skipped = batch
+            if not processed:
+                break
+            result["batches"] += 1
+            result["messages"] += processed
+            result["skipped"] += skipped
+        result["watermark"] = self.repo.get_watermark()
+        db.session.rollback()
+        return result
+
+    def _run_batch(self) -> tuple[int, int] | None:
+        try:
+            if not self.repo.try_lock_rollup():
+                db.session.rollback()
+                return None
+
+            upper = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds))
+            id_range = {"$lt": upper}
+            watermark = self.repo.get_watermark()
+            if watermark:
+                id_range["$gt"] = ObjectId(watermark)
+
+            if self.repo.get_watermark(PLATFORM_ROLLUP_NAME) is None:
+                self._backfill_platform(watermark)
+
+            docs = list(
+                self.collection
+                .find({"_id": id_range}, PROJECTION)
+                .sort("_id", 1)
+                .limit(self.batch_size)
+            )
+            if not docs:
+                # Caught up: move the watermark to the settle bound so quiet days still close.
+                if not watermark or ObjectId(watermark) < upper:
+                    self.repo.set_watermark(str(upper))
+                db.session.commit()
+                return 0, 0
+
+            bot_ids = self.repo.existing_bot_ids({d.get("chatbotId") for d in docs if d.get("chatbotId")})
+            rollups: dict[tuple[int, date], DayRollup] = {}
+            platform: dict[date, PlatformDayRollup] = defaultdict(PlatformDayRollup)
+            skipped = 0
+            for doc in docs:
+                if not doc.get("timestamp"):
+                    skipped += 1
+                    continue
+                platform[doc["timestamp"].date()].add(doc)
+
+                bot_id = doc.get("chatbotId")
+                if bot_id not in bot_ids:
+                    skipped += 1
+                    continue
+                key = (bot_id, doc["timestamp"].date())
+                rollups.setdefault(key, DayRollup()).add(doc)
+
+            rows = self.repo.get_rows(list(rollups))
+            for key, rollup in rollups.items():
+                row = rows.get(key)
+                if row is None:
+                    row = Analytics(bot_id=key[0], date=key[1])
+                    db.session.add(row)
+                rollup.apply_to(row)
+            self._apply_platform(platform)
+
+            self.repo.set_watermark(str(docs[-1]["_id"]))
+            db.session.commit()
+            return len(docs), skipped
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _apply_platform(self, platform: dict[date, PlatformDayRollup]) -> None:
+        rows = self.repo.get_platform_days(set(platform))
+        for day, rollup in platform.items():
+            row = rows.get(day)
+            if row is None:
+                row = PlatformUsageDay(date=day)
+                db.session.add(row)
+            rollup.apply_to(row)
+
+    def _backfill_platform(self, watermark: str | None) -> None:
+        """
+        One-off: platform_usage_day was added after the rollup had started, so
+        rebuild it from raw messages up to the current watermark. Session ids
+        are streamed from a (day, session) $group straight into the sketches.
+        """
+        platform: dict[date, PlatformDayRollup] = defaultdict(PlatformDayRollup)
+        if watermark:
+            pipeline = [
+                {"$match": {"_id": {"$lte": ObjectId(watermark)}, "timestamp": {"$ne": None}}},
+                {"$group": {
+                    "_id": {
+                        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                        "session": "$sessionId",
+                    },
+                    "n": {"$sum": 1},
+                }},
+            ]
+            for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+                day = platform[date.fromisoformat(row["_id"]["day"])]
+                day.messages += row["n"]
+                if row["_id"].get("session"):
+                    day.sessions.add(row["_id"]["session"])
+
+        self._apply_platform(platform)
+        # "" (not None) when there was nothing to backfill.
+        self.repo.set_watermark(watermark or "", PLATFORM_ROLLUP_NAME)
+        logger.info("Backfilled platform usage for %d days", len(platform))
+
+
+def complete_before(repo: AnalyticsRepository | None = None) -> date | None:
+    """Days strictly before this date are fully rolled up (None before the first run)."""
+    watermark = (repo or AnalyticsRepository()).get_watermark()
+    return ObjectId(watermark).generation_time.date() if watermark else None
+
+
+class RollupScheduler:
+    """Runs the rollup every `interval_seconds` on a daemon thread in each worker process."""
+
+    def __init__(self, app, mongo, interval_seconds: float, batch_size: int, settle_seconds: float):
+        self.app = app
+        self.mongo = mongo
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self.last_result: dict | None = None
+
+    def build_service(self) -> AnalyticsRollupService:
+        return AnalyticsRollupService(
+            self.mongo.db.chatMessages,
+            batch_size=self.batch_size,
+            settle_seconds=self.settle_seconds,
+        )
+
+    def ensure_started(self) -> None:
+        # Threads do not survive fork, so each worker starts its own on its first request.
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == pid:
+                return
+            self._thread = threading.Thread(target=self._loop, name="analytics-rollup", daemon=True)
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _loop(self) -> None:
+        # Jitter so workers started together do not all contend for the lock.
+        time.sleep(random.uniform(0, min(self.interval_seconds, 30)))
+        while True:
+            with self.app.app_context():
+                try:
+                    self.last_result = self.build_service().run()
+                except Exception:
+                    logger.exception("Analytics rollup failed")
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval_seconds)
+
+
+def init_rollups(app, mongo) -> RollupScheduler:
+    scheduler = RollupScheduler(
+        app,
+        mongo,
+        interval_seconds=app.config.get("ANALYTICS_ROLLUP_INTERVAL_SECONDS", 300.0),
+        batch_size=app.config.get("ANALYTICS_ROLLUP_BATCH_SIZE", 5000),
+        settle_seconds=app.config.get("ANALYTICS_ROLLUP_SETTLE_SECONDS", 120.0),
+    )
+    app.extensions[EXTENSION_KEY] = scheduler
+
+    if scheduler.interval_seconds > 0:
+        @app.before_request
+        def _start_analytics_rollup():
+            scheduler.ensure_started()
+
+    @app.cli.command("analytics-rollup")
+    @click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+    def analytics_rollup_command(max_batches):
+        """Fold new chat messages into the analytics table."""
+        result = scheduler.build_service().run(max_batches=max_batches)
+        click.echo(
+            f"Folded {result['messages']} messages in {result['batches']} batches "
+            f"({result['skipped']} skipped); watermark {result['watermark']}"
+            + (" [another rollup holds the lock]" if result["locked"] else "")
+        )
+
+    return scheduler
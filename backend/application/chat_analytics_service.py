@@ -0,0 +1,290 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from backend.application.ai.chatbot_service import CONTEXT_CONFIDENCE_THRESHOLD
+from backend.application.analytics_rollup import (
+    CONFIDENCE_BINS,
+    complete_before,
+    load_confidence,
+    load_hourly,
+    load_intents,
+)
+from backend.application.hyperloglog import HyperLogLog
+from backend.application.latency_histogram import LatencySummary, latency_by_bot
+from backend.data_access.Analytics.analytics import AnalyticsRepository
+from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
+
+# Values treated as "no logged-in sender" (matches missing fields too).
+ANONYMOUS = [None, 0, ""]
+
+
+def parse_range(date_from: Optional[str], date_to: Optional[str]) -> tuple[datetime, datetime]:
+    """
+    YYYY-MM-DD bounds, inclusive of the whole `to` day (UTC).
+    Defaults to the last 7 days. Raises ValueError on a malformed date.
+    """
+    end = datetime.strptime(date_to, "%Y-%m-%d") if date_to else datetime.utcnow()
+    start = datetime.strptime(date_from, "%Y-%m-%d") if date_from else end - timedelta(days=6)
+    return datetime.combine(start.date(), time.min), end.replace(hour=23, minute=59, second=59)
+
+
+def hour_label(hour: Optional[int]) -> Optional[str]:
+    return None if hour is None else datetime.strptime(str(hour), "%H").strftime("%I %p")
+
+
+class ChatAnalyticsService:
+    """
+    Usage analytics for one organisation's chatbot.
+
+    Days already folded into the `analytics` rollup are read from it; the rest
+    of the range (normally just today) comes from a single $facet aggregation
+    over the raw user messages. Distinct users/sessions are exact when the
+    whole range is raw and HyperLogLog estimates once rollup days are involved.
+    """
+
+    def __init__(self, repo: ChatMessageRepository, analytics_repo: AnalyticsRepository | None = None):
+        self.repo = repo
+        self.analytics_repo = analytics_repo
+
+    def _facets(self, organisation_id: int, start: datetime, end: datetime, distinct_ids: bool = False) -> dict:
+        # distinct_ids returns the ids themselves (to feed a sketch) instead of their count.
+        distinct_tail = [] if distinct_ids else [{"$count": "n"}]
+        pipeline = [
+            {"$match": {
+                "organisationId": organisation_id,
+                "sender": "user",
+                "timestamp": {"$gte": start, "$lte": end},
+            }},
+            {"$facet": {
+                "daily": [
+                    {"$group": {
+                        "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                        "count": {"$sum": 1},
+                    }},
+                ],
+                "hourly": [
+                    {"$group": {"_id": {"$hour": "$timestamp"}, "count": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}},
+                ],
+                "users": [
+                    {"$match": {"senderUserId": {"$nin": ANONYMOUS}}},
+                    {"$group": {"_id": "$senderUserId"}},
+                    *distinct_tail,
+                ],
+                "sessions": [
+                    {"$match": {"senderUserId": {"$in": ANONYMOUS}, "sessionId": {"$nin": [None, ""]}}},
+                    {"$group": {"_id": "$sessionId"}},
+                    *distinct_tail,
+                ],
+            }},
+        ]
+        result = list(self.repo.collection.aggregate(pipeline, allowDiskUse=True))
+        return result[0] if result else {}
+
+    def _rolled_until(self, start: datetime, end: datetime) -> date | None:
+        """Exclusive end of the leading part of the range served from rollups, if any."""
+        if self.analytics_repo is None:
+            return None
+        boundary = complete_before(self.analytics_repo)
+        if boundary is None or boundary <= start.date():
+            return None
+        return min(boundary, end.date() + timedelta(days=1))
+
+    @staticmethod
+    def _raw_counts(facets: dict) -> tuple[Counter, Counter]:
+        daily = Counter({
+            date.fromisoformat(row["_id"]): row["count"]
+            for row in facets.get("daily", [])
+            if row.get("_id")
+        })
+        hourly = Counter({
+            row["_id"]: row["count"]
+            for row in facets.get("hourly", [])
+            if row.get("_id") is not None
+        })
+        return daily, hourly
+
+    def _counts(self, organisation_id: int, start: datetime, end: datetime):
+        rolled_until = self._rolled_until(start, end)
+        if rolled_until is None:
+            facets = self._facets(organisation_id, start, end)
+            daily_counts, hourly_counts = self._raw_counts(facets)
+            users = (facets.get("users") or [{}])[0].get("n", 0)
+            sessions = (facets.get("sessions") or [{}])[0].get("n", 0)
+            return daily_counts, hourly_counts, users, sessions
+
+        daily_counts, hourly_counts = Counter(), Counter()
+        users, sessions = HyperLogLog(), HyperLogLog()
+        for row in self.analytics_repo.daily_for_organisation(organisation_id, start.date(), rolled_until):
+            daily_counts[row.date] += row.user_messages or 0
+            for hour, n in enumerate(load_hourly(row)):
+                if n:
+                    hourly_counts[hour] += n
+            users.merge(HyperLogLog.from_bytes(row.user_sketch))
+            sessions.merge(HyperLogLog.from_bytes(row.session_sketch))
+
+        raw_start = datetime.combine(rolled_until, time.min)
+        if raw_start <= end:
+            facets = self._facets(organisation_id, raw_start, end, distinct_ids=True)
+            raw_daily, raw_hourly = self._raw_counts(facets)
+            daily_counts.update(raw_daily)
+            hourly_counts.update(raw_hourly)
+            users.update(row["_id"] for row in facets.get("users", []))
+            # Rollup session sketches hold every session with a user message; sessions
+            # are only reported when there are no logged-in users, where the sets agree.
+            sessions.update(row["_id"] for row in facets.get("sessions", []))
+
+        return daily_counts, hourly_counts, users.count(), sessions.count()
+
+    def get_usage(self, organisation_id: int, start: datetime, end: datetime) -> dict:
+        daily_counts, hourly_counts, users, sessions = self._counts(organisation_id, start, end)
+
+        daily_list = []
+        cursor = start.date()
+        while cursor <= end.date():
+            daily_list.append({
+                "date": cursor.strftime("%d-%m-%Y"),
+                "day": cursor.strftime("%A"),
+                "count": daily_counts.get(cursor, 0),
+            })
+            cursor += timedelta(days=1)
+
+        most_active_hour = max(hourly_counts, key=hourly_counts.get) if hourly_counts else None
+
+        return {
+            "daily_chats": daily_list,
+            "total_chats": sum(daily_counts.values()),
+            # Logged-in users when there are any, otherwise anonymous sessions.
+            "unique_users": users if users else sessions,
+            "most_active_hour": {
+                "hour_24": most_active_hour,
+                "label": hour_label(most_active_hour),
+                "count": hourly_counts.get(most_active_hour, 0) if most_active_hour is not None else 0,
+            },
+        }
+
+    def get_latency(self, organisation_id: int, start: datetime, end: datetime) -> dict:
+        """Reply latency percentiles per stage and per intent (bot messages with timings)."""
+        summary = LatencySummary()
+        raw_start = start
+
+        rolled_until = self._rolled_until(start, end)
+        if rolled_until is not None:
+            for row in self.analytics_repo.daily_for_organisation(organisation_id, start.date(), rolled_until):
+                summary.merge(LatencySummary.from_json(row.latency_histogram))
+            raw_start = datetime.combine(rolled_until, time.min)
+
+        if raw_start <= end:
+            match = {"organisationId": organisation_id, "timestamp": {"$gte": raw_start, "$lte": end}}
+            for bot_summary in latency_by_bot(self.repo.collection, match).values():
+                summary.merge(bot_summary)
+
+        return summary.report()
+
+    def _raw_intents(self, organisation_id: int, start: datetime, end: datetime) -> dict[date, tuple[int, Counter, list[int]]]:
+        """Per day: user messages, intent counts and confidence histogram, grouped inside MongoDB."""
+        confidence = "$metadata.confidence"
+        pipeline = [
+            {"$match": {
+                "organisationId": organisation_id,
+                "sender": "user",
+                "timestamp": {"$gte": start, "$lte": end},
+            }},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                    "intent": "$metadata.intent",
+                    "bin": {"$cond": [
+                        {"$isNumber": confidence},
+                        {"$min": [CONFIDENCE_BINS - 1, {"$max": [0, {"$floor": {"$multiply": [confidence, CONFIDENCE_BINS]}}]}]},
+                        None,
+                    ]},
+                },
+                "n": {"$sum": 1},
+            }},
+        ]
+
+        totals: Counter = Counter()
+        intents: dict[date, Counter] = defaultdict(Counter)
+        bins: dict[date, list[int]] = defaultdict(lambda: [0] * CONFIDENCE_BINS)
+        for row in self.repo.collection.aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            day = date.fromisoformat(key["day"])
+            totals[day] += row["n"]
+            if key.get("intent"):
+                intents[day][key["intent"]] += row["n"]
+            if key.get("bin") is not None:
+                bins[day][int(key["bin"])] += row["n"]
+        return {day: (total, intents[day], bins[day]) for day, total in totals.items()}
+
+    def get_intent_stats(
+        self,
+        organisation_id: int,
+        start: datetime,
+        end: datetime,
+        low_confidence_threshold: float = CONTEXT_CONFIDENCE_THRESHOLD,
+    ) -> dict:
+        """
+        Intent frequencies, fallback rate and low-confidence rate, overall and
+        per day. Rates are over user messages; the low-confidence rate only
+        counts messages stored with a confidence, on a 1 / CONFIDENCE_BINS grid.
+        """
+        days: dict[date, tuple[int, Counter, list[int]]] = {}
+        raw_start = start
+
+        rolled_until = self._rolled_until(start, end)
+        if rolled_until is not None:
+            for row in self.analytics_repo.daily_for_organisation(organisation_id, start.date(), rolled_until):
+                total, intents, bins = days.get(row.date, (0, Counter(), [0] * CONFIDENCE_BINS))
+                days[row.date] = (
+                    total + (row.user_messages or 0),
+                    intents + load_intents(row),
+                    [a + b for a, b in zip(bins, load_confidence(row))],
+                )
+            raw_start = datetime.combine(rolled_until, time.min)
+
+        if raw_start <= end:
+            days.update(self._raw_intents(organisation_id, raw_start, end))
+
+        low_bins = round(low_confidence_threshold * CONFIDENCE_BINS)
+
+        def rates(total: int, intents: Counter, bins: list[int]) -> dict:
+            scored = sum(bins)
+            fallback = intents.get("fallback", 0)
+            low = sum(bins[:low_bins])
+            return {
+                "total": total,
+                "fallback": fallback,
+                "fallback_rate": round(fallback / total, 4) if total else None,
+                "scored": scored,
+                "low_confidence": low,
+                "low_confidence_rate": round(low / scored, 4) if scored else None,
+            }
+
+        overall_total, overall_intents, overall_bins = 0, Counter(), [0] * CONFIDENCE_BINS
+        daily = []
+        cursor = start.date()
+        while cursor <= end.date():
+            total, intents, bins = days.get(cursor, (0, Counter(), [0] * CONFIDENCE_BINS))
+            overall_total += total
+            overall_intents += intents
+            overall_bins = [a + b for a, b in zip(overall_bins, bins)]
+            daily.append({
+                "date": cursor.strftime("%d-%m-%Y"),
+                "day": cursor.strftime("%A"),
+                **rates(total, intents, bins),
+                "intents": dict(intents.most_common()),
+            })
+            cursor += timedelta(days=1)
+
+        classified = sum(overall_intents.values())
+        return {
+            **rates(overall_total, overall_intents, overall_bins),
+            "low_confidence_threshold": low_bins / CONFIDENCE_BINS,
+            "intents": [
+                {"intent": intent, "count": n, "share": round(n / classified, 4)}
+                for intent, n in overall_intents.most_common()
+            ],
+            "daily": daily,
+        }
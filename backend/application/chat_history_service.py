@@ -1,7 +1,74 @@
-from datetime import datetime
+import base64
+import calendar
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
 from typing import Optional, Iterator
 
+from bson import ObjectId
+from bson.errors import InvalidId
+
 from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
+from backend.data_access.ChatMessages.search_tokens import tokenize
+
+# How get_chat_history_page reports the total:
+#   none      - no count
+#   exact     - count_documents on every call
+#   cached    - exact count, reused per query for COUNT_CACHE_TTL_SECONDS
+#   estimated - count capped at ESTIMATE_CAP ("at least N" beyond that)
+COUNT_MODES = ("none", "exact", "cached", "estimated")
+COUNT_CACHE_TTL_SECONDS = 60.0
+COUNT_CACHE_MAX_SIZE = 1024
+ESTIMATE_CAP = 1000
+
+# Keyword searches are ranked by the number of query tokens a message contains
+# (newest first on ties), over at most SEARCH_CANDIDATE_LIMIT of the most recent
+# matches. "recent" requires every token and keeps plain newest-first order.
+SORT_MODES = ("relevance", "recent")
+SEARCH_CANDIDATE_LIMIT = 5000
+
+# searchTokens is only needed to match, not to display.
+RESULT_PROJECTION = {"searchTokens": 0}
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque cursor for a message's ([score,] timestamp, _id) position."""
+    ts = doc["timestamp"]
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    ms = calendar.timegm(ts.timetuple()) * 1000 + ts.microsecond // 1000
+    data = {"t": ms, "id": str(doc["_id"])}
+    if "_score" in doc:
+        data["s"] = doc["_score"]
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId, Optional[int]]:
+    """Raises ValueError for anything that is not a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        score = data.get("s")
+        return (
+            datetime.fromtimestamp(data["t"] / 1000, tz=timezone.utc),
+            ObjectId(data["id"]),
+            int(score) if score is not None else None,
+        )
+    except (ValueError, TypeError, KeyError, AttributeError, InvalidId) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _keyset_filter(fields: list[str], values: list, op: str) -> dict:
+    """Rows strictly after `values` in the lexicographic order of `fields`."""
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = dict(zip(fields[:i], values[:i]))
+        clause[field] = {op: values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
 
 
 class ChatHistoryService:
@@ -11,22 +78,30 @@ class ChatHistoryService:
 
     EXPORT_LIMIT = 10_000  # hard safety cap for free tier
 
+    # Shared across instances (one service is built per request).
+    _count_lock = threading.Lock()
+    _count_cache: dict[tuple, tuple[float, int]] = {}
+
     def __init__(self, repo: ChatMessageRepository):
         self.repo = repo
 
-    def get_chat_history(
+    def _build_query(
         self,
         organisation_id: int,
         keyword: Optional[str] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-        page: int = 1,
-        page_size: int = 20,
-    ):
+        match_any: bool = False,
+    ) -> dict:
         query = {"organisationId": organisation_id}
 
         if keyword:
-            query["message"] = {"$regex": keyword, "$options": "i"}
+            tokens = tokenize(keyword, query=True)
+            if tokens:
+                query["searchTokens"] = {"$in" if match_any else "$all": tokens}
+            else:
+                # Nothing indexable (stopwords or punctuation only): literal substring match.
+                query["message"] = {"$regex": re.escape(keyword), "$options": "i"}
 
         if date_from or date_to:
             query["timestamp"] = {}
@@ -35,14 +110,175 @@ class ChatHistoryService:
             if date_to:
                 query["timestamp"]["$lte"] = date_to
 
+        return query
+
+    @staticmethod
+    def _is_ranked(keyword: Optional[str], sort: str) -> bool:
+        """Whether a search uses relevance order (any query token matches) or
+        plain newest-first order (every token must match)."""
+        if sort not in SORT_MODES:
+            raise ValueError(f"sort must be one of {SORT_MODES}")
+        return sort == "relevance" and bool(keyword and tokenize(keyword, query=True))
+
+    def _ranked_candidates(self, query: dict, keyword: str) -> list[dict]:
+        """Pipeline head shared by every ranked read: the scored candidate set."""
+        tokens = tokenize(keyword, query=True)
+        return [
+            {"$match": query},
+            {"$sort": {"timestamp": -1}},
+            {"$limit": SEARCH_CANDIDATE_LIMIT},
+            {"$addFields": {"_score": {"$size": {"$setIntersection": ["$searchTokens", tokens]}}}},
+        ]
+
+    def _count(self, query: dict, cache_key: tuple, mode: str) -> tuple[Optional[int], bool]:
+        """Returns (total, is_lower_bound)."""
+        if mode == "none":
+            return None, False
+
+        if mode == "estimated":
+            total = self.repo.collection.count_documents(query, limit=ESTIMATE_CAP)
+            return total, total >= ESTIMATE_CAP
+
+        if mode == "cached":
+            entry = self._count_cache.get(cache_key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1], False
+
+        total = self.repo.collection.count_documents(query)
+
+        if mode == "cached":
+            with self._count_lock:
+                if len(self._count_cache) >= COUNT_CACHE_MAX_SIZE:
+                    self._count_cache.clear()
+                self._count_cache[cache_key] = (time.monotonic() + COUNT_CACHE_TTL_SECONDS, total)
+        return total, False
+
+    def get_chat_history_page(
+        self,
+        organisation_id: int,
+        keyword: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        direction: str = "next",
+        page_size: int = 20,
+        count: str = "cached",
+        sort: str = "relevance",
+    ) -> dict:
+        """
+        Keyset pagination. Without a keyword (or with sort="recent") rows are
+        newest first on (timestamp, _id); keyword searches default to relevance
+        order on (score, timestamp, _id). `next` pages move down that order,
+        `prev` back up it; cost is independent of depth.
+        Raises ValueError for a malformed cursor, direction, count or sort mode.
+        """
+        if direction not in ("next", "prev"):
+            raise ValueError("direction must be 'next' or 'prev'")
+        if count not in COUNT_MODES:
+            raise ValueError(f"count must be one of {COUNT_MODES}")
+
+        ranked = self._is_ranked(keyword, sort)
+        query = self._build_query(organisation_id, keyword, date_from, date_to, match_any=ranked)
+        total, total_is_lower_bound = self._count(
+            query,
+            (organisation_id, keyword, date_from, date_to, ranked),
+            count,
+        )
+        if ranked and total is not None and total >= SEARCH_CANDIDATE_LIMIT:
+            total, total_is_lower_bound = SEARCH_CANDIDATE_LIMIT, True
+
+        after = None
+        if cursor:
+            ts, oid, score = decode_cursor(cursor)
+            if ranked and score is None:
+                raise ValueError("invalid cursor")
+            after = [score, ts, oid] if ranked else [ts, oid]
+
+        if ranked:
+            rows = self._search_rows(query, keyword, after, direction, page_size + 1)
+        else:
+            filters = query
+            if after:
+                op = "$lt" if direction == "next" else "$gt"
+                filters = {"$and": [query, _keyset_filter(["timestamp", "_id"], after, op)]}
+
+            order = -1 if direction == "next" else 1
+            rows = list(
+                self.repo.collection
+                .find(filters, RESULT_PROJECTION)
+                .sort([("timestamp", order), ("_id", order)])
+                .limit(page_size + 1)
+            )
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if direction == "prev":
+            rows.reverse()
+            has_newer, has_older = has_more, bool(cursor)
+        else:
+            has_newer, has_older = bool(cursor), has_more
+
+        return {
+            "messages": rows,
+            "next_cursor": encode_cursor(rows[-1]) if rows and has_older else None,
+            "prev_cursor": encode_cursor(rows[0]) if rows and has_newer else None,
+            "total": total,
+            "total_is_lower_bound": total_is_lower_bound,
+        }
+
+    def _search_rows(self, query: dict, keyword: str, after: Optional[list], direction: str, limit: int) -> list:
+        """Ranked rows: `_score` is the number of query tokens the message contains."""
+        order = -1 if direction == "next" else 1
+
+        pipeline = self._ranked_candidates(query, keyword)
+        if after:
+            op = "$lt" if direction == "next" else "$gt"
+            pipeline.append({"$match": _keyset_filter(["_score", "timestamp", "_id"], after, op)})
+        pipeline += [
+            {"$sort": {"_score": order, "timestamp": order, "_id": order}},
+            {"$limit": limit},
+            {"$project": RESULT_PROJECTION},
+        ]
+        return list(self.repo.collection.aggregate(pipeline))
+
+    def get_chat_history(
+        self,
+        organisation_id: int,
+        keyword: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        page: int = 1,
+        page_size: int = 20,
+        sort: str = "relevance",
+    ):
+        """
+        Offset pagination; kept for clients that jump straight to page N.
+        Matches and orders rows exactly like get_chat_history_page, so page N
+        continues page N-1 of the same search whichever method served it.
+        Raises ValueError for an unknown sort mode.
+        """
+        ranked = self._is_ranked(keyword, sort)
+        query = self._build_query(organisation_id, keyword, date_from, date_to, match_any=ranked)
+
         skip = max(page - 1, 0) * page_size
 
+        if ranked:
+            total = min(self.repo.collection.count_documents(query), SEARCH_CANDIDATE_LIMIT)
+            pipeline = self._ranked_candidates(query, keyword) + [
+                {"$sort": {"_score": -1, "timestamp": -1, "_id": -1}},
+                {"$skip": skip},
+                {"$limit": page_size},
+                {"$project": RESULT_PROJECTION},
+            ]
+            return total, list(self.repo.collection.aggregate(pipeline))
+
         total = self.repo.collection.count_documents(query)
 
         cursor = (
             self.repo.collection
-            .find(query)
-            .sort("timestamp", -1)
+            .find(query, RESULT_PROJECTION)
+            .sort([("timestamp", -1), ("_id", -1)])
             .skip(skip)
             .limit(page_size)
         )
@@ -58,30 +294,37 @@ class ChatHistoryService:
         keyword: Optional[str] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
+        sort: str = "relevance",
     ) -> Iterator[str]:
         """
         Streams CSV rows to avoid memory spikes.
-        """
 
-        query = {"organisationId": organisation_id}
-
-        if keyword:
-            query["message"] = {"$regex": keyword, "$options": "i"}
+        A keyword export holds the same rows as the search with the same
+        `sort`: relevance exports every ranked candidate (any query token),
+        recent exports messages containing every token. Rows are always
+        written oldest first. Raises ValueError for an unknown sort mode
+        (before the first row).
+        """
+        ranked = self._is_ranked(keyword, sort)
+        query = self._build_query(organisation_id, keyword, date_from, date_to, match_any=ranked)
 
-        if date_from or date_to:
-            query["timestamp"] = {}
-            if date_from:
-                query["timestamp"]["$gte"] = date_from
-            if date_to:
-                query["timestamp"]["$lte"] = date_to
+        if ranked:
+            cursor = self.repo.collection.aggregate(self._ranked_candidates(query, keyword) + [
+                {"$sort": {"timestamp": 1, "_id": 1}},
+                {"$project": RESULT_PROJECTION},
+            ])
+        else:
+            cursor = (
+                self.repo.collection
+                .find(query, RESULT_PROJECTION)
+                .sort("timestamp", 1)
+                .limit(self.EXPORT_LIMIT)
+            )
 
-        cursor = (
-            self.repo.collection
-            .find(query)
-            .sort("timestamp", 1)
-            .limit(self.EXPORT_LIMIT)
-        )
+        return self._csv_rows(cursor)
 
+    @staticmethod
+    def _csv_rows(cursor) -> Iterator[str]:
         # CSV header
         yield "timestamp,session_id,sender,sender_name,message,intent\n"
 
@@ -15,7 +15,9 @@ class ChatMessageService:
         sender_user_id: int | None = None,
         sender_name: str | None = None,
         intent: str | None = None,
+        confidence: float | None = None,
         embedding_id: str | None = None,
+        timings: dict | None = None,
     ) -> str:
         chat_message = ChatMessage(
             organisation_id=organisation_id,
@@ -26,7 +28,9 @@ class ChatMessageService:
             sender_name=sender_name,
             message=message,
             intent=intent,
+            confidence=confidence,
             embedding_id=embedding_id,
+            timings=timings,
         )
         return self.repo.insert(chat_message)
 
@@ -0,0 +1,58 @@
+import hashlib
+import zlib
+
+import numpy as np
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch (~1.6% standard error at the default
+    precision). Rollups store one per bot per day so distinct users/sessions
+    over any range are a register-wise max away, without keeping the ids.
+    """
+
+    def __init__(self, precision: int = 12, registers: np.ndarray | None = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, value) -> None:
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        bits = 64 - self.precision
+        idx = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, values) -> "HyperLogLog":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "HyperLogLog | None") -> "HyperLogLog":
+        if other is not None:
+            if other.precision != self.precision:
+                raise ValueError("cannot merge sketches of different precision")
+            np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting).
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        # Sparse days compress to a few bytes.
+        return bytes([self.precision]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes | None) -> "HyperLogLog | None":
+        if not data:
+            return None
+        registers = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).copy()
+        return cls(precision=data[0], registers=registers)
@@ -0,0 +1,158 @@
+import json
+from bisect import bisect_right
+from collections import defaultdict
+
+# Per-turn stage timings (ms) stored on bot messages as metadata.timings.
+STAGES = ("intent", "context", "template", "render", "persist", "total")
+
+# Fixed bucket bounds so histograms from any day/bot/worker merge by addition.
+# Bucket i counts values v with BUCKET_BOUNDS_MS[i-1] <= v < BUCKET_BOUNDS_MS[i].
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+NUM_BUCKETS = len(BUCKET_BOUNDS_MS) + 1
+
+PERCENTILES = (50, 95, 99)
+
+
+def bucket_index(ms: float) -> int:
+    return bisect_right(BUCKET_BOUNDS_MS, ms)
+
+
+def bucket_index_expr(value: str) -> dict:
+    """The same bucket index computed inside a MongoDB aggregation."""
+    return {"$size": {"$filter": {"input": list(BUCKET_BOUNDS_MS), "cond": {"$lte": ["$$this", value]}}}}
+
+
+def percentile(counts: list[int], q: float) -> float | None:
+    """Linear interpolation inside the bucket holding the q-th percentile."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = total * q / 100.0
+    seen = 0
+    for i, n in enumerate(counts):
+        if n and seen + n >= rank:
+            lower = BUCKET_BOUNDS_MS[i - 1] if i > 0 else 0.0
+            if i >= len(BUCKET_BOUNDS_MS):
+                return float(lower)  # overflow bucket: report its lower bound
+            upper = BUCKET_BOUNDS_MS[i]
+            return round(lower + (upper - lower) * (rank - seen) / n, 2)
+        seen += n
+    return float(BUCKET_BOUNDS_MS[-1])
+
+
+def _empty() -> list[int]:
+    return [0] * NUM_BUCKETS
+
+
+class LatencySummary:
+    """Mergeable latency histograms: one per stage, plus the total per intent."""
+
+    def __init__(self):
+        self.stages: dict[str, list[int]] = defaultdict(_empty)
+        self.intents: dict[str, list[int]] = defaultdict(_empty)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def add(self, timings: dict, intent: str | None = None) -> None:
+        for stage, ms in timings.items():
+            if stage in STAGES and isinstance(ms, (int, float)):
+                self.stages[stage][bucket_index(ms)] += 1
+        total = timings.get("total")
+        if isinstance(total, (int, float)):
+            self.count += 1
+            self.sum_ms += total
+            if intent:
+                self.intents[intent][bucket_index(total)] += 1
+
+    def add_bucket(self, stage: str, index: int, n: int, sum_ms: float, intent: str | None = None) -> None:
+        """Folds in a pre-bucketed count (from bucket_index_expr)."""
+        if stage not in STAGES:
+            return
+        self.stages[stage][index] += n
+        if stage == "total":
+            self.count += n
+            self.sum_ms += sum_ms
+            if intent:
+                self.intents[intent][index] += n
+
+    def merge(self, other: "LatencySummary | None") -> "LatencySummary":
+        if other is None:
+            return self
+        for target, source in ((self.stages, other.stages), (self.intents, other.intents)):
+            for key, counts in source.items():
+                target[key] = [a + b for a, b in zip(target[key], counts)]
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        return self
+
+    @property
+    def avg_ms(self) -> float | None:
+        return round(self.sum_ms / self.count, 2) if self.count else None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "bounds_ms": list(BUCKET_BOUNDS_MS),
+            "stages": self.stages,
+            "intents": self.intents,
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 2),
+        })
+
+    @classmethod
+    def from_json(cls, raw: str | None) -> "LatencySummary | None":
+        if not raw:
+            return None
+        data = json.loads(raw)
+        summary = cls()
+        summary.stages.update(data.get("stages") or {})
+        summary.intents.update(data.get("intents") or {})
+        summary.count = data.get("count", 0)
+        summary.sum_ms = data.get("sum_ms", 0.0)
+        return summary
+
+    def report(self) -> dict:
+        def quantiles(counts):
+            return {f"p{q}": percentile(counts, q) for q in PERCENTILES}
+
+        return {
+            "count": self.count,
+            "avg_ms": self.avg_ms,
+            "stages": {stage: quantiles(self.stages[stage]) for stage in STAGES if stage in self.stages},
+            "intents": sorted(
+                ({"intent": intent, "count": sum(counts), **quantiles(counts)} for intent, counts in self.intents.items()),
+                key=lambda row: row["p95"] or 0,
+                reverse=True,
+            ),
+        }
+
+
+def latency_by_bot(collection, match: dict) -> dict[int, LatencySummary]:
+    """
+    Histograms of metadata.timings for the bot messages matching `match`,
+    bucketed inside MongoDB so only (bot, stage, intent, bucket) counts return.
+    """
+    pipeline = [
+        {"$match": {**match, "sender": "bot", "metadata.timings": {"$exists": True}}},
+        {"$project": {
+            "chatbotId": 1,
+            "intent": "$metadata.intent",
+            "timing": {"$objectToArray": "$metadata.timings"},
+        }},
+        {"$unwind": "$timing"},
+        {"$group": {
+            "_id": {
+                "bot": "$chatbotId",
+                "stage": "$timing.k",
+                "intent": {"$cond": [{"$eq": ["$timing.k", "total"]}, "$intent", None]},
+                "bucket": bucket_index_expr("$timing.v"),
+            },
+            "n": {"$sum": 1},
+            "sum": {"$sum": "$timing.v"},
+        }},
+    ]
+
+    summaries: dict[int, LatencySummary] = defaultdict(LatencySummary)
+    for row in collection.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        summaries[key["bot"]].add_bucket(key["stage"], key["bucket"], row["n"], row["sum"], key.get("intent"))
+    return dict(summaries)
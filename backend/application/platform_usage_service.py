@@ -0,0 +1,168 @@
+import threading
+import time as clock
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+
+from bson import ObjectId
+
+from backend.application.analytics_rollup import complete_before
+from backend.application.hyperloglog import HyperLogLog
+from backend.application.latency_histogram import LatencySummary, latency_by_bot
+from backend.data_access.Analytics.analytics import PLATFORM_ROLLUP_NAME, AnalyticsRepository
+
+USAGE_METRICS = ("messages", "sessions")
+
+# How long the still-open days (watermark day .. today) are reused before being recomputed.
+OPEN_DAYS_TTL_SECONDS = 30.0
+MAX_SERIES_DAYS = 31
+
+
+class PlatformUsageService:
+    """
+    Platform-wide usage for the sysadmin dashboard: messages/sessions per UTC
+    day and per-tenant reply latency.
+
+    Daily usage comes from platform_usage_day, which the analytics rollup
+    keeps up to its watermark. Closed days are read once and memoised per
+    process; the open days add the few minutes of messages past the watermark
+    to their stored HyperLogLog session sketch and are reused for
+    OPEN_DAYS_TTL_SECONDS. Cost is independent of platform volume.
+    """
+
+    # Shared across instances (one service is built per request).
+    _cache_lock = threading.Lock()
+    _closed_days: dict[date, tuple[int, int]] = {}  # day -> (messages, sessions)
+    _open_days: tuple[float, object, date | None, dict] | None = None  # (expires, key, boundary, counts)
+
+    def __init__(self, collection, analytics_repo: AnalyticsRepository | None = None):
+        self.collection = collection
+        self.analytics_repo = analytics_repo or AnalyticsRepository()
+
+    def _rolled_until(self, start: date, today: date) -> date:
+        """Exclusive end of the days served from rollups (== start when none are)."""
+        boundary = complete_before(self.analytics_repo)
+        if boundary is None or boundary <= start:
+            return start
+        return min(boundary, today + timedelta(days=1))
+
+    def _raw_by_day(self, match: dict) -> dict[date, tuple[int, HyperLogLog]]:
+        """Messages and a session sketch per day, streamed from a (day, session) $group."""
+        pipeline = [
+            {"$match": {"$and": [match, {"timestamp": {"$ne": None}}]}},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                    "session": "$sessionId",
+                },
+                "n": {"$sum": 1},
+            }},
+        ]
+        messages: dict[date, int] = defaultdict(int)
+        sessions: dict[date, HyperLogLog] = defaultdict(HyperLogLog)
+        for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+            day = date.fromisoformat(row["_id"]["day"])
+            messages[day] += row["n"]
+            if row["_id"].get("session"):
+                sessions[day].add(row["_id"]["session"])
+        return {day: (n, sessions[day]) for day, n in messages.items()}
+
+    def _compute_open_days(self, start: date, today: date) -> tuple[object, date | None, dict]:
+        watermark = self.analytics_repo.get_watermark()
+        if not watermark or self.analytics_repo.get_watermark(PLATFORM_ROLLUP_NAME) is None:
+            # Rollup has not run yet: the whole range comes from raw messages.
+            since = datetime.combine(start, time.min, tzinfo=timezone.utc)
+            raw = self._raw_by_day({"timestamp": {"$gte": since}})
+            return ("raw", start), None, {day: (n, sketch.count()) for day, (n, sketch) in raw.items()}
+
+        boundary = min(ObjectId(watermark).generation_time.date(), today)
+        raw = self._raw_by_day({"_id": {"$gt": ObjectId(watermark)}})
+
+        counts = {}
+        stored = {row.date: row for row in self.analytics_repo.platform_days(boundary, today + timedelta(days=1))}
+        for day in set(stored) | set(raw):
+            raw_messages, raw_sessions = raw.get(day, (0, HyperLogLog()))
+            row = stored.get(day)
+            if row is not None and raw_messages:
+                sessions = raw_sessions.merge(HyperLogLog.from_bytes(self.analytics_repo.platform_sketch(day))).count()
+            elif row is not None:
+                sessions = row.sessions
+            else:
+                sessions = raw_sessions.count()
+            counts[day] = ((row.messages if row else 0) + raw_messages, sessions)
+        return ("rollup", watermark), boundary, counts
+
+    def _open_day_counts(self, start: date, today: date) -> tuple[date | None, dict]:
+        now = clock.monotonic()
+        cached = self._open_days
+        if cached is not None and cached[0] > now and (cached[2] is not None or cached[1] == ("raw", start)):
+            return cached[2], cached[3]
+
+        key, boundary, counts = self._compute_open_days(start, today)
+        with self._cache_lock:
+            PlatformUsageService._open_days = (now + OPEN_DAYS_TTL_SECONDS, key, boundary, counts)
+        return boundary, counts
+
+    def _closed_day_counts(self, start: date, boundary: date) -> dict[date, tuple[int, int]]:
+        days = [start + timedelta(days=i) for i in range((boundary - start).days)]
+        missing = [d for d in days if d not in self._closed_days]
+        if missing:
+            rows = {r.date: (r.messages, r.sessions) for r in self.analytics_repo.platform_days(missing[0], boundary)}
+            with self._cache_lock:
+                if len(self._closed_days) > 4 * MAX_SERIES_DAYS:
+                    self._closed_days.clear()
+                for day in missing:
+                    self._closed_days[day] = rows.get(day, (0, 0))
+        return {d: self._closed_days.get(d, (0, 0)) for d in days}
+
+    def daily_series(self, days: int, metric: str) -> list[dict]:
+        if metric not in USAGE_METRICS:
+            raise ValueError(f"metric must be one of {USAGE_METRICS}")
+
+        today = datetime.now(timezone.utc).date()
+        start = today - timedelta(days=days - 1)
+
+        boundary, counts_by_day = self._open_day_counts(start, today)
+        if boundary is not None and boundary > start:
+            counts_by_day = {**self._closed_day_counts(start, boundary), **counts_by_day}
+
+        column = 0 if metric == "messages" else 1
+        series = []
+        for i in range(days):
+            day = start + timedelta(days=i)
+            series.append({
+                "date": str(day),
+                "count": counts_by_day.get(day, (0, 0))[column]
+            })
+        return series
+
+    def latency_by_tenant(self, days: int, limit: int = 20) -> list[dict]:
+        """Per-bot reply latency over the last `days` UTC days, slowest p95 first."""
+        today = datetime.now(timezone.utc).date()
+        start = today - timedelta(days=days - 1)
+
+        rolled_until = self._rolled_until(start, today)
+
+        summaries: dict[int, LatencySummary] = defaultdict(LatencySummary)
+        if rolled_until > start:
+            for row in self.analytics_repo.daily_for_platform(start, rolled_until):
+                summaries[row.bot_id].merge(LatencySummary.from_json(row.latency_histogram))
+        if rolled_until <= today:
+            raw_start = datetime.combine(rolled_until, time.min, tzinfo=timezone.utc)
+            for bot_id, summary in latency_by_bot(self.collection, {"timestamp": {"$gte": raw_start}}).items():
+                summaries[bot_id].merge(summary)
+
+        organisations = self.analytics_repo.bot_organisations(set(summaries))
+        tenants = []
+        for bot_id, summary in summaries.items():
+            if not summary.count:
+                continue
+            organisation_id, name = organisations.get(bot_id, (None, None))
+            tenants.append({
+                "bot_id": bot_id,
+                "organisation_id": organisation_id,
+                "organisation_name": name,
+                **summary.report(),
+            })
+
+        tenants.sort(key=lambda t: t["stages"].get("total", {}).get("p95") or 0, reverse=True)
+        return tenants[:limit]
@@ -0,0 +1,105 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from backend import db
+from backend.models import Analytics, AnalyticsRollupState, Chatbot, Organisation, PlatformUsageDay
+
+ROLLUP_NAME = "chat_messages"
+# Marks that platform_usage_day has been backfilled (last_message_id: the rollup watermark at that time).
+PLATFORM_ROLLUP_NAME = "platform_usage"
+
+# pg advisory lock key held while a rollup batch is folded in (one runner at a time).
+ROLLUP_LOCK_KEY = 0x42_6F_74_46  # "BotF"
+
+
+class AnalyticsRepository:
+
+    def try_lock_rollup(self) -> bool:
+        """Transaction-scoped; released by the commit/rollback that ends the batch."""
+        return bool(db.session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": ROLLUP_LOCK_KEY},
+        ).scalar())
+
+    def get_watermark(self, name: str = ROLLUP_NAME) -> str | None:
+        state = db.session.get(AnalyticsRollupState, name)
+        return state.last_message_id if state else None
+
+    def set_watermark(self, message_id: str, name: str = ROLLUP_NAME) -> None:
+        state = db.session.get(AnalyticsRollupState, name)
+        if state is None:
+            state = AnalyticsRollupState(name=name)
+            db.session.add(state)
+        state.last_message_id = message_id
+
+    def get_rows(self, keys: list[tuple[int, date]]) -> dict[tuple[int, date], Analytics]:
+        if not keys:
+            return {}
+        bot_ids = {bot_id for bot_id, _ in keys}
+        days = {day for _, day in keys}
+        rows = (
+            Analytics.query
+            .filter(Analytics.bot_id.in_(bot_ids), Analytics.date.in_(days))
+            .all()
+        )
+        return {(r.bot_id, r.date): r for r in rows}
+
+    def get_platform_days(self, days: set[date]) -> dict[date, PlatformUsageDay]:
+        if not days:
+            return {}
+        rows = PlatformUsageDay.query.filter(PlatformUsageDay.date.in_(days)).all()
+        return {r.date: r for r in rows}
+
+    def platform_days(self, start: date, end: date) -> list[PlatformUsageDay]:
+        """start <= date < end, without the sketches."""
+        return (
+            db.session.query(PlatformUsageDay.date, PlatformUsageDay.messages, PlatformUsageDay.sessions)
+            .filter(PlatformUsageDay.date >= start, PlatformUsageDay.date < end)
+            .all()
+        )
+
+    def platform_sketch(self, day: date) -> bytes | None:
+        return (
+            db.session.query(PlatformUsageDay.session_sketch)
+            .filter(PlatformUsageDay.date == day)
+            .scalar()
+        )
+
+    def existing_bot_ids(self, bot_ids: set[int]) -> set[int]:
+        if not bot_ids:
+            return set()
+        rows = db.session.query(Chatbot.bot_id).filter(Chatbot.bot_id.in_(bot_ids)).all()
+        return {r.bot_id for r in rows}
+
+    def daily_for_organisation(self, organisation_id: int, start: date, end: date) -> list[Analytics]:
+        """Rollup rows of every bot of the organisation, start <= date < end."""
+        return (
+            Analytics.query
+            .join(Chatbot, Chatbot.bot_id == Analytics.bot_id)
+            .filter(
+                Chatbot.organisation_id == organisation_id,
+                Analytics.date >= start,
+                Analytics.date < end,
+            )
+            .all()
+        )
+
+    def daily_for_platform(self, start: date, end: date) -> list[Analytics]:
+        return (
+            Analytics.query
+            .filter(Analytics.date >= start, Analytics.date < end)
+            .all()
+        )
+
+    def bot_organisations(self, bot_ids: set[int]) -> dict[int, tuple[int, str]]:
+        """bot_id -> (organisation_id, organisation name)."""
+        if not bot_ids:
+            return {}
+        rows = (
+            db.session.query(Chatbot.bot_id, Organisation.organisation_id, Organisation.name)
+            .join(Organisation, Organisation.organisation_id == Chatbot.organisation_id)
+            .filter(Chatbot.bot_id.in_(bot_ids))
+            .all()
+        )
+        return {r.bot_id: (r.organisation_id, r.name) for r in rows}
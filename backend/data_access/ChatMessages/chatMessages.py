@@ -2,6 +2,10 @@ from datetime import datetime, timezone
 from bson import ObjectId
 from typing import Optional
 
+from pymongo import UpdateOne
+
+from backend.data_access.ChatMessages.search_tokens import tokenize
+
 class ChatMessage:
     """
     Domain representation of a chat message.
@@ -18,7 +22,9 @@ class ChatMessage:
         sender_user_id: Optional[int] = None,
         sender_name: Optional[str] = None,
         intent: Optional[str] = None,
+        confidence: Optional[float] = None,
         embedding_id: Optional[str] = None,
+        timings: Optional[dict] = None,
         timestamp: Optional[datetime] = None,
         _id: Optional[ObjectId] = None,
     ):
@@ -35,8 +41,13 @@ class ChatMessage:
         self.metadata = {}
         if intent:
             self.metadata["intent"] = intent
+        if confidence is not None:
+            self.metadata["confidence"] = round(float(confidence), 4)
         if embedding_id:
             self.metadata["embeddingId"] = embedding_id
+        if timings:
+            # Per-stage response latency in ms (bot replies only)
+            self.metadata["timings"] = timings
 
     def to_dict(self) -> dict:
         doc = {
@@ -47,6 +58,7 @@ class ChatMessage:
             "senderUserId": self.sender_user_id,
             "senderName": self.sender_name,
             "message": self.message,
+            "searchTokens": tokenize(self.message),
             "timestamp": self.timestamp,
             "metadata": self.metadata,
         }
@@ -67,7 +79,9 @@ class ChatMessage:
             sender_user_id=doc.get("senderUserId"),
             sender_name=doc.get("senderName"),
             intent=doc.get("metadata", {}).get("intent"),
+            confidence=doc.get("metadata", {}).get("confidence"),
             embedding_id=doc.get("metadata", {}).get("embeddingId"),
+            timings=doc.get("metadata", {}).get("timings"),
             timestamp=doc.get("timestamp"),
             _id=doc.get("_id"),
         )
@@ -78,11 +92,20 @@ class ChatMessage:
 # ==============================
 
 class ChatMessageRepository:
-    def __init__(self, db):
+    def __init__(self, db, writer=None):
         self.collection = db.chatMessages
+        # Optional ChatMessageWriter; when set, inserts are write-behind.
+        self.writer = writer
 
     def insert(self, message: ChatMessage) -> str:
-        result = self.collection.insert_one(message.to_dict())
+        doc = message.to_dict()
+        if self.writer is not None:
+            # The _id is generated here so callers get it without waiting for Mongo.
+            doc.setdefault("_id", ObjectId())
+            self.writer.write(doc)
+            return str(doc["_id"])
+
+        result = self.collection.insert_one(doc)
         return str(result.inserted_id)
 
     def get_by_session(
@@ -110,3 +133,28 @@ class ChatMessageRepository:
 
         return [ChatMessage.from_dict(doc) for doc in docs]
 
+    def backfill_search_tokens(self, batch_size: int = 1000, retokenize: bool = False) -> int:
+        """Writes searchTokens on messages stored before search existed. Returns messages updated."""
+        query = {} if retokenize else {"searchTokens": {"$exists": False}}
+        updated = 0
+        last_id = None
+
+        while True:
+            page = dict(query)
+            if last_id is not None:
+                page["_id"] = {"$gt": last_id}
+            docs = list(
+                self.collection
+                .find(page, {"message": 1})
+                .sort("_id", 1)
+                .limit(batch_size)
+            )
+            if not docs:
+                return updated
+
+            self.collection.bulk_write(
+                [UpdateOne({"_id": d["_id"]}, {"$set": {"searchTokens": tokenize(d.get("message"))}}) for d in docs],
+                ordered=False,
+            )
+            updated += len(docs)
+            last_id = docs[-1]["_id"]
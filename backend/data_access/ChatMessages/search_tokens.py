@@ -0,0 +1,72 @@
+import re
+import unicodedata
+
+# Tokens stored on each chat message (`searchTokens`) so history search can use
+# a multikey index instead of an unanchored regex. The same function tokenizes
+# the stored message and the search query, so both sides always agree.
+#
+#   en/fr - casefolded words, accents stripped, stopwords dropped, trailing plural "s" removed
+#   zh    - no word boundaries, so each run of ideographs gives unigrams and bigrams
+
+MAX_TOKENS = 256
+
+_WORD = re.compile(r"[^\W_]+")
+_CJK_RUN = re.compile("[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its me my of on or our so that the
+their them they this to was we were what when where which who will with you your
+au aux avec ce ces dans de des du elle en est et il ils je la le les leur mais me mes mon ne
+nous on ou par pas pour qu que qui sa se ses son sur ta te tes ton tu un une vos votre vous
+""".split())
+
+
+def _fold(word: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", word)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _stem(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _cjk_tokens(run: str, query: bool) -> list[str]:
+    bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+    if query and bigrams:
+        # Stored messages carry unigrams too, so bigrams alone are enough to match.
+        return bigrams
+    return list(run) + bigrams
+
+
+def tokenize(text: str | None, query: bool = False) -> list[str]:
+    """Unique search tokens for `text`, in first-seen order."""
+    if not text:
+        return []
+
+    text = unicodedata.normalize("NFKC", text).casefold()
+    tokens: dict[str, None] = {}
+
+    for word in _WORD.findall(text):
+        pos = 0
+        for run in _CJK_RUN.finditer(word):
+            _add_word(tokens, word[pos:run.start()])
+            for token in _cjk_tokens(run.group(), query):
+                tokens[token] = None
+            pos = run.end()
+        _add_word(tokens, word[pos:])
+
+        if len(tokens) >= MAX_TOKENS:
+            break
+
+    return list(tokens)[:MAX_TOKENS]
+
+
+def _add_word(tokens: dict, word: str) -> None:
+    if not word:
+        return
+    word = _fold(word)
+    if word in STOPWORDS or (len(word) < 2 and not word.isdigit()):
+        return
+    tokens[_stem(word)] = None
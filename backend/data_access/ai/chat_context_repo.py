@@ -0,0 +1,100 @@
+import threading
+import time
+
+from backend import db
+from backend.models import Chatbot, Organisation, Personality
+from backend.data_access.ai.company_profile_repo import PROFILE_LOAD_OPTIONS, CompanyProfileRepository
+
+
+class ChatbotSettings:
+    """Detached, read-only copy of the Chatbot fields used to build replies."""
+
+    __slots__ = ("bot_id", "organisation_id", "personality_id", "welcome_message", "primary_language", "allow_emojis")
+
+    def __init__(self, chatbot: Chatbot):
+        self.bot_id = chatbot.bot_id
+        self.organisation_id = chatbot.organisation_id
+        self.personality_id = chatbot.personality_id
+        self.welcome_message = chatbot.welcome_message
+        self.primary_language = chatbot.primary_language
+        self.allow_emojis = chatbot.allow_emojis
+
+
+class ChatContext:
+    """
+    Everything the chat hot path needs about one organisation: the company
+    profile (with subtype fields), its chatbot settings and personality name.
+    Treated as immutable; edits replace the cached bundle.
+    """
+
+    __slots__ = ("organisation_id", "company", "chatbot", "personality_name")
+
+    def __init__(self, organisation_id: int, company: dict, chatbot: ChatbotSettings | None, personality_name: str | None):
+        self.organisation_id = organisation_id
+        self.company = company
+        self.chatbot = chatbot
+        self.personality_name = personality_name
+
+
+class ChatContextRepository:
+    """
+    Loads an organisation, its subtype row, chatbot and personality in a single
+    SELECT and caches the resulting ChatContext per process for `ttl_seconds`.
+    `invalidate` is called when the profile or chatbot settings are edited.
+    """
+
+    def __init__(self, company_repository: CompanyProfileRepository, ttl_seconds: float = 300.0):
+        self.company_repository = company_repository
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache: dict[int, tuple[float, ChatContext]] = {}
+
+    def invalidate(self, organisation_id: int | str) -> None:
+        try:
+            org_id = int(organisation_id)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._cache.pop(org_id, None)
+
+    def get(self, organisation_id: int | str | None) -> ChatContext | None:
+        if not organisation_id:
+            return None
+
+        try:
+            org_id = int(organisation_id)
+        except (TypeError, ValueError):
+            return None
+
+        entry = self._cache.get(org_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        context = self._load(org_id)
+        # Orgs without a chatbot yet are not cached, so one created on another
+        # worker is seen on the next request.
+        if context is not None and context.chatbot is not None:
+            with self._lock:
+                self._cache[org_id] = (time.monotonic() + self.ttl_seconds, context)
+        return context
+
+    def _load(self, org_id: int) -> ChatContext | None:
+        row = (
+            db.session.query(Organisation, Chatbot, Personality)
+            .outerjoin(Chatbot, Chatbot.organisation_id == Organisation.organisation_id)
+            .outerjoin(Personality, Personality.personality_id == Chatbot.personality_id)
+            .options(*PROFILE_LOAD_OPTIONS)
+            .filter(Organisation.organisation_id == org_id)
+            .order_by(Chatbot.bot_id.asc())
+            .first()
+        )
+        if not row:
+            return None
+
+        organisation, chatbot, personality = row
+        return ChatContext(
+            organisation_id=org_id,
+            company=self.company_repository.build_profile(organisation),
+            chatbot=ChatbotSettings(chatbot) if chatbot else None,
+            personality_name=personality.name if personality else None,
+        )
@@ -1,9 +1,15 @@
-from backend import db
-from backend.models import (
-    Organisation,
-    OrganisationRestaurant,
-    OrganisationEducation,
-    OrganisationRetail,
+import threading
+import time
+
+from sqlalchemy.orm import joinedload
+
+from backend.models import Organisation
+
+# Eager-loads every subtype row in the same SELECT as the organisation.
+PROFILE_LOAD_OPTIONS = (
+    joinedload(Organisation.restaurant),
+    joinedload(Organisation.education),
+    joinedload(Organisation.retail),
 )
 
 
@@ -11,8 +17,24 @@ class CompanyProfileRepository:
     """
     Repository responsible for fetching organisation (company) profiling
     data used by the chatbot and admin UI.
+
+    Profiles are loaded with the subtype row in one joined query and kept in
+    a per-process TTL cache; `invalidate` is called when a profile is edited.
     """
 
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache: dict[int, tuple[float, dict | None]] = {}
+
+    def invalidate(self, organisation_id: int | str) -> None:
+        try:
+            org_id = int(organisation_id)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._cache.pop(org_id, None)
+
     def get_company_profile(self, organisation_id: int | str):
         """
         Returns a dictionary of all organisation fields needed for
@@ -28,18 +50,35 @@ class CompanyProfileRepository:
         except (TypeError, ValueError):
             return None
 
-        organisation = db.session.get(Organisation, org_id)
+        entry = self._cache.get(org_id)
+        if entry is not None and entry[0] > time.monotonic():
+            profile = entry[1]
+        else:
+            profile = self._load(org_id)
+            with self._lock:
+                self._cache[org_id] = (time.monotonic() + self.ttl_seconds, profile)
+
+        # Callers get their own copy so the cached profile cannot be mutated.
+        return dict(profile) if profile is not None else None
+
+    def _load(self, org_id: int) -> dict | None:
+        organisation = (
+            Organisation.query
+            .options(*PROFILE_LOAD_OPTIONS)
+            .filter(Organisation.organisation_id == org_id)
+            .first()
+        )
 
         if not organisation:
             return None
 
         # Convert SQLAlchemy model -> dictionary (including subtype)
-        return self._to_dict(organisation)
+        return self.build_profile(organisation)
 
     # -------------------------------------------------------------------
     # Helper: Converts Organisation model into data usable by templates
     # -------------------------------------------------------------------
-    def _to_dict(self, org: Organisation):
+    def build_profile(self, org: Organisation):
         # Normalize industry for downstream template lookup
         industry_raw = (org.industry or "").strip().lower()
         industry_map = {
@@ -69,7 +108,7 @@ class CompanyProfileRepository:
         }
 
         if industry == "restaurant":
-            r = OrganisationRestaurant.query.get(org.organisation_id)
+            r = org.restaurant
             if r:
                 data.update({
                     "cuisine_type": r.cuisine_type,
@@ -83,7 +122,7 @@ class CompanyProfileRepository:
                 })
 
         elif industry == "education":
-            e = OrganisationEducation.query.get(org.organisation_id)
+            e = org.education
             if e:
                 data.update({
                     "institution_type": e.institution_type,
@@ -97,7 +136,7 @@ class CompanyProfileRepository:
                 })
 
         elif industry == "retail":
-            r = OrganisationRetail.query.get(org.organisation_id)
+            r = org.retail
             if r:
                 data.update({
                     "retail_type": r.retail_type,
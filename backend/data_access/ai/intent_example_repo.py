@@ -0,0 +1,71 @@
+from sqlalchemy import func
+
+from backend import db
+from backend.models import ChatbotIntentExample
+
+
+class IntentExampleRepository:
+    """
+    Data access for organisation-specific intent examples.
+
+    Embeddings are stored on the row as float16 bytes so that only new or
+    edited texts ever need to go through the encoder.
+    """
+
+    def list_by_organisation(self, organisation_id: int) -> list[ChatbotIntentExample]:
+        return (
+            ChatbotIntentExample.query
+            .filter_by(organisation_id=organisation_id)
+            .order_by(ChatbotIntentExample.intent.asc(), ChatbotIntentExample.intent_example_id.asc())
+            .all()
+        )
+
+    def get_version(self, organisation_id: int):
+        """Cheap change marker: (row count, max id, last update)."""
+        row = (
+            db.session.query(
+                func.count(ChatbotIntentExample.intent_example_id),
+                func.max(ChatbotIntentExample.intent_example_id),
+                func.max(ChatbotIntentExample.updated_at),
+            )
+            .filter(ChatbotIntentExample.organisation_id == organisation_id)
+            .one()
+        )
+        return tuple(row)
+
+    def replace_for_organisation(self, organisation_id: int, examples: list[tuple[str, str]]) -> None:
+        """
+        Makes the org's examples equal to `examples` [(intent, text), ...].
+        Rows whose text is unchanged keep their stored embedding, even if the
+        intent was changed.
+        """
+        existing = {r.text: r for r in self.list_by_organisation(organisation_id)}
+        wanted = {text: intent for intent, text in examples}
+
+        for text, row in existing.items():
+            if text not in wanted:
+                db.session.delete(row)
+            elif row.intent != wanted[text]:
+                row.intent = wanted[text]
+
+        for text, intent in wanted.items():
+            if text not in existing:
+                db.session.add(ChatbotIntentExample(
+                    organisation_id=organisation_id,
+                    intent=intent,
+                    text=text,
+                ))
+
+        db.session.commit()
+
+    def get_unencoded(self, organisation_id: int) -> list[ChatbotIntentExample]:
+        return (
+            ChatbotIntentExample.query
+            .filter_by(organisation_id=organisation_id, embedding=None)
+            .all()
+        )
+
+    def save_embeddings(self, rows: list[ChatbotIntentExample], embeddings) -> None:
+        for row, emb in zip(rows, embeddings):
+            row.embedding = emb
+        db.session.commit()
@@ -1,3 +1,6 @@
+import threading
+import time
+
 from backend.models import ChatbotQuickReply
 
 LANGUAGE_MAP = {
@@ -44,6 +47,42 @@ class QuickReplyRepository:
         "zh": {"预约"},
     }
 
+    def __init__(self, refresh_seconds: float = 300.0):
+        # Every ChatbotQuickReply row is grouped by (org, industry, language, intent)
+        # from one query and resolved answers are memoised; reloaded every
+        # `refresh_seconds` or after `invalidate()`.
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None  # (loaded_at, groups, resolved)
+
+    def invalidate(self) -> None:
+        """Drops the loaded quick replies; call after editing chatbot_quick_reply rows."""
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot[0] < self.refresh_seconds:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot[0] >= self.refresh_seconds:
+                query = ChatbotQuickReply.query.with_entities(
+                    ChatbotQuickReply.organisation_id,
+                    ChatbotQuickReply.industry,
+                    ChatbotQuickReply.language,
+                    ChatbotQuickReply.intent,
+                    ChatbotQuickReply.text,
+                ).order_by(ChatbotQuickReply.display_order.asc(), ChatbotQuickReply.quick_reply_id.asc())
+
+                groups: dict[tuple, list[str]] = {}
+                for row in query.all():
+                    groups.setdefault((row.organisation_id, row.industry, row.language, row.intent), []).append(row.text)
+                snapshot = (time.monotonic(), groups, {})
+                self._snapshot = snapshot
+        return snapshot
+
     def _normalize_language(self, language: str | None) -> str:
         if not language:
             return "en"
@@ -55,33 +94,42 @@ class QuickReplyRepository:
             return replies
         return [reply for reply in replies if reply not in excluded]
 
+    def get_all_texts(self) -> list[str]:
+        """
+        Every distinct quick-reply text a user could click, across all orgs and
+        languages, including the in-code defaults. Used to pre-seed intent lookup.
+        """
+        texts = {t for replies in self.DEFAULT_QUICK_REPLIES.values() for t in replies}
+        rows = ChatbotQuickReply.query.with_entities(ChatbotQuickReply.text).distinct().all()
+        texts.update(r.text for r in rows if r.text)
+        return sorted(texts)
+
     def get_quick_replies(self, company_id: str | int | None, industry: str, intent: str, language: str | None):
         industry = industry or "default"
         intent = intent or "any"
         language = self._normalize_language(language)
 
-        def _rows_to_text(rows):
-            return self._filter_excluded([r.text for r in rows], language)
-
-        def _query(org_id: int | None, ind: str, lang: str, it: str):
-            return (
-                ChatbotQuickReply.query
-                .filter_by(
-                    organisation_id=org_id,
-                    industry=ind,
-                    language=lang,
-                    intent=it,
-                )
-                .order_by(ChatbotQuickReply.display_order.asc())
-                .all()
-            )
-
         org_id = None
         try:
             org_id = int(company_id) if company_id is not None else None
         except (TypeError, ValueError):
             org_id = None
 
+        _, groups, resolved = self._load()
+        key = (org_id, industry, intent, language)
+        replies = resolved.get(key)
+        if replies is None:
+            replies = self._resolve(groups, org_id, industry, intent, language)
+            resolved[key] = replies
+        return list(replies)
+
+    def _resolve(self, groups: dict, org_id: int | None, industry: str, intent: str, language: str) -> list[str]:
+        def _rows_to_text(rows):
+            return self._filter_excluded(rows, language)
+
+        def _query(org_id: int | None, ind: str, lang: str, it: str):
+            return groups.get((org_id, ind, lang, it))
+
         # 1) Org-specific for intent, then any
         if org_id is not None:
             rows = _query(org_id, industry, language, intent)
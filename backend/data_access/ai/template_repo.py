@@ -10,6 +10,9 @@
 
 # backend/data_access/ai/template_repo.py
 
+import threading
+import time
+
 from backend.models import ChatbotTemplate
 
 LANGUAGE_MAP = {
@@ -105,11 +108,47 @@ class TemplateRepository:
         # }
     }
 
+    def __init__(self, refresh_seconds: float = 300.0):
+        # All ChatbotTemplate rows are loaded in one query and resolved answers are
+        # memoised per (org, industry, intent, language). The snapshot is reloaded
+        # every `refresh_seconds`, or immediately after `invalidate()`.
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None  # (loaded_at, rows, resolved)
+
     def _normalize_language(self, language: str | None) -> str:
         if not language:
             return "en"
         return LANGUAGE_MAP.get(language.strip().lower(), "en")
 
+    def invalidate(self) -> None:
+        """Drops the loaded templates; call after editing chatbot_template rows."""
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot[0] < self.refresh_seconds:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot[0] >= self.refresh_seconds:
+                rows: dict[tuple, str] = {}
+                query = ChatbotTemplate.query.with_entities(
+                    ChatbotTemplate.organisation_id,
+                    ChatbotTemplate.industry,
+                    ChatbotTemplate.language,
+                    ChatbotTemplate.intent,
+                    ChatbotTemplate.template_text,
+                ).order_by(ChatbotTemplate.template_id.asc())
+                for row in query.all():
+                    # Lowest template_id wins, as with the per-lookup .first() queries.
+                    rows.setdefault((row.organisation_id, row.industry, row.language, row.intent), row.template_text)
+                snapshot = (time.monotonic(), rows, {})
+                self._snapshot = snapshot
+        return snapshot
+
     def get_template(self, company_id: str, industry: str, intent: str, language: str | None = None) -> str:
         """
         Returns a template string using:
@@ -122,52 +161,51 @@ class TemplateRepository:
         industry = industry or "default"
         language = self._normalize_language(language)
 
-        def _db_lookup(org_id: int | None, ind: str, lang: str, it: str):
-            return (
-                ChatbotTemplate.query
-                .filter_by(
-                    organisation_id=org_id,
-                    industry=ind,
-                    language=lang,
-                    intent=it,
-                )
-                .order_by(ChatbotTemplate.template_id.asc())
-                .first()
-            )
-
         org_id = None
         try:
             org_id = int(company_id) if company_id is not None else None
         except (TypeError, ValueError):
             org_id = None
 
+        _, rows, resolved = self._load()
+        key = (org_id, industry, intent, language)
+        template = resolved.get(key)
+        if template is None:
+            template = self._resolve(rows, org_id, industry, intent, language)
+            resolved[key] = template
+        return template
+
+    def _resolve(self, rows: dict, org_id: int | None, industry: str, intent: str, language: str) -> str:
+        def _db_lookup(org_id: int | None, ind: str, lang: str, it: str):
+            return rows.get((org_id, ind, lang, it))
+
         # Collect fallbacks, but prefer an explicit intent template (DB or in-code) over DB "fallback".
         fallback_templates: list[str] = []
 
         # 1) Company override (language)
         if org_id is not None:
-            row = _db_lookup(org_id, industry, language, intent)
-            if row:
-                return row.template_text
-            row = _db_lookup(org_id, industry, language, "fallback")
-            if row and row.template_text:
-                fallback_templates.append(row.template_text)
+            text = _db_lookup(org_id, industry, language, intent)
+            if text is not None:
+                return text
+            text = _db_lookup(org_id, industry, language, "fallback")
+            if text:
+                fallback_templates.append(text)
 
         # 2) Industry default (language)
-        row = _db_lookup(None, industry, language, intent)
-        if row:
-            return row.template_text
-        row = _db_lookup(None, industry, language, "fallback")
-        if row and row.template_text:
-            fallback_templates.append(row.template_text)
+        text = _db_lookup(None, industry, language, intent)
+        if text is not None:
+            return text
+        text = _db_lookup(None, industry, language, "fallback")
+        if text:
+            fallback_templates.append(text)
 
         # 3) Default industry (language)
-        row = _db_lookup(None, "default", language, intent)
-        if row:
-            return row.template_text
-        row = _db_lookup(None, "default", language, "fallback")
-        if row and row.template_text:
-            fallback_templates.append(row.template_text)
+        text = _db_lookup(None, "default", language, intent)
+        if text is not None:
+            return text
+        text = _db_lookup(None, "default", language, "fallback")
+        if text:
+            fallback_templates.append(text)
 
         # 4) In-code fallback for the requested intent (useful when DB doesn't have that intent yet).
         industry_templates = self.DEFAULT_TEMPLATES.get(industry, self.DEFAULT_TEMPLATES["default"])
@@ -0,0 +1,179 @@
+# Declarative MongoDB index set. Indexes are created with the CLI, or at startup
+# when MONGO_ENSURE_INDEXES is set; otherwise startup only warns about missing ones:
+#
+#   flask --app backend.run mongo-indexes           # create missing indexes
+#   flask --app backend.run mongo-indexes --check   # report missing indexes only
+#   flask --app backend.run chat-search-backfill    # add searchTokens to older messages
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+import click
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+
+logger = logging.getLogger(__name__)
+
+# collection -> indexes. Names are fixed so creation is idempotent and drift is visible.
+INDEXES = {
+    "chatMessages": [
+        # get_by_session: equality on org/bot/session, newest first
+        IndexModel(
+            [("organisationId", ASCENDING), ("chatbotId", ASCENDING), ("sessionId", ASCENDING), ("timestamp", DESCENDING)],
+            name="org_bot_session_ts",
+        ),
+        # chat history keyset pages / CSV export: org, optional date range, (timestamp, _id) order
+        IndexModel(
+            [("organisationId", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="org_ts_id",
+        ),
+        # chat history keyword search: multikey on searchTokens, newest candidates first
+        IndexModel(
+            [("organisationId", ASCENDING), ("searchTokens", ASCENDING), ("timestamp", DESCENDING)],
+            name="org_tokens_ts",
+        ),
+        # org analytics: org + sender equality, timestamp range
+        IndexModel(
+            [("organisationId", ASCENDING), ("sender", ASCENDING), ("timestamp", ASCENDING)],
+            name="org_sender_ts",
+        ),
+        # platform-wide daily usage
+        IndexModel([("timestamp", ASCENDING)], name="ts"),
+    ],
+}
+
+
+def ensure_indexes(db) -> dict:
+    """Creates any missing index; returns {collection: [index names]}."""
+    created = {}
+    for collection, models in INDEXES.items():
+        created[collection] = db[collection].create_indexes(models)
+    return created
+
+
+def missing_indexes(db) -> dict:
+    missing = {}
+    for collection, models in INDEXES.items():
+        existing = set(db[collection].index_information())
+        names = [m.document["name"] for m in models if m.document["name"] not in existing]
+        if names:
+            missing[collection] = names
+    return missing
+
+
+def _sample_queries(organisation_id: int) -> dict:
+    """The hot query shapes, as (collection, filter, sort)."""
+    since = datetime.now(timezone.utc) - timedelta(days=7)
+    return {
+        "session_messages": (
+            "chatMessages",
+            {"organisationId": organisation_id, "chatbotId": 0, "sessionId": ""},
+            [("timestamp", DESCENDING)],
+        ),
+        "chat_history": (
+            "chatMessages",
+            {"organisationId": organisation_id},
+            [("timestamp", DESCENDING), ("_id", DESCENDING)],
+        ),
+        "chat_search": (
+            "chatMessages",
+            {"organisationId": organisation_id, "searchTokens": {"$in": ["refund", "booking"]}},
+            [("timestamp", DESCENDING)],
+        ),
+        "org_analytics": (
+            "chatMessages",
+            {"organisationId": organisation_id, "sender": "user", "timestamp": {"$gte": since}},
+            None,
+        ),
+        "daily_usage": (
+            "chatMessages",
+            {"timestamp": {"$gte": since}},
+            None,
+        ),
+    }
+
+
+def _plan_stages(plan: dict) -> list[dict]:
+    stages = [plan]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def explain_queries(db, organisation_id: int) -> list[dict]:
+    """Runs explain() on each hot query shape and flags collection scans."""
+    report = []
+    for name, (collection, query, sort) in _sample_queries(organisation_id).items():
+        cursor = db[collection].find(query).limit(20)
+        if sort:
+            cursor = cursor.sort(sort)
+        explained = cursor.explain()
+
+        stages = _plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+        stats = explained.get("executionStats", {})
+        report.append({
+            "query": name,
+            "collection": collection,
+            "collscan": any(s.get("stage") == "COLLSCAN" for s in stages),
+            "index": next((s.get("indexName") for s in stages if s.get("indexName")), None),
+            "stages": [s.get("stage") for s in stages],
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "returned": stats.get("nReturned"),
+        })
+    return report
+
+
+def warn_missing_indexes(uri: str, db_name: str, timeout_ms: int) -> None:
+    """Logs missing managed indexes using a short-lived client bounded by `timeout_ms`."""
+    client = MongoClient(uri, serverSelectionTimeoutMS=timeout_ms)
+    try:
+        missing = missing_indexes(client[db_name])
+        if missing:
+            logger.warning("MongoDB indexes missing: %s (run `flask mongo-indexes`)", missing)
+    except Exception as e:
+        logger.warning("MongoDB index check skipped: %s", e)
+    finally:
+        client.close()
+
+
+def init_indexes(app, mongo) -> None:
+    """
+    Registers the index CLI commands. At startup the index set is ensured
+    (MONGO_ENSURE_INDEXES) or only checked, never failing app start; either
+    way the client is closed again so a --preload master does not hold one
+    across fork.
+    """
+    if app.config.get("MONGO_ENSURE_INDEXES", False):
+        try:
+            ensure_indexes(mongo.db)
+        except Exception:
+            logger.exception("MongoDB index check failed")
+        finally:
+            mongo.close()
+    elif app.config.get("MONGO_INDEX_CHECK_TIMEOUT_MS", 0) > 0:
+        warn_missing_indexes(mongo.uri, mongo.db_name, app.config["MONGO_INDEX_CHECK_TIMEOUT_MS"])
+
+    @app.cli.command("mongo-indexes")
+    @click.option("--check", is_flag=True, help="Only report missing indexes.")
+    def mongo_indexes_command(check):
+        """Create (or check) the managed MongoDB indexes."""
+        if check:
+            missing = missing_indexes(mongo.db)
+            click.echo(f"Missing: {missing}" if missing else "All managed indexes exist.")
+            raise SystemExit(1 if missing else 0)
+
+        for collection, names in ensure_indexes(mongo.db).items():
+            click.echo(f"{collection}: {', '.join(names)}")
+
+    @app.cli.command("chat-search-backfill")
+    @click.option("--batch-size", default=1000, show_default=True)
+    @click.option("--all", "retokenize", is_flag=True, help="Re-tokenize every message, not just those missing tokens.")
+    def chat_search_backfill_command(batch_size, retokenize):
+        """Write searchTokens on chat messages stored before keyword search."""
+        from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
+
+        updated = ChatMessageRepository(mongo.db).backfill_search_tokens(batch_size, retokenize)
+        click.echo(f"Updated {updated} messages.")
@@ -0,0 +1,196 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# What happens to a message when the queue is full:
+#   spill - write it synchronously on the request thread (no data loss, caller pays the latency)
+#   drop  - discard it and count it
+OVERFLOW_POLICIES = ("spill", "drop")
+
+DUPLICATE_KEY = 11000
+
+
+class ChatMessageWriter:
+    """
+    Write-behind persistence for chat messages.
+
+    Request threads enqueue documents that already carry a client-generated
+    `_id` and return immediately. A worker thread drains the bounded queue with
+    unordered `insert_many`, flushing when `batch_size` documents are waiting
+    or `flush_interval_ms` after the first one arrived. Pending documents are
+    flushed at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable[[], Any],
+        max_queue: int = 10000,
+        batch_size: int = 100,
+        flush_interval_ms: float = 50.0,
+        overflow: str = "spill",
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+
+        self.get_collection = get_collection
+        self.max_queue = max(int(max_queue), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = max(flush_interval_ms, 0.0) / 1000.0
+        self.overflow = overflow
+
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        # Documents enqueued but not yet written (or failed); flush() waits on it.
+        self._idle = threading.Condition()
+        self._pending = 0
+
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "batches": 0,
+            "max_depth": 0,
+        }
+        self.last_error: str | None = None
+
+        atexit.register(self.close)
+
+    def write(self, doc: dict) -> bool:
+        """Queues one document. Returns False if it was dropped."""
+        self._ensure_worker()
+
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+            return self._overflow(doc)
+
+        with self._lock:
+            self._stats["enqueued"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        return True
+
+    def _overflow(self, doc: dict) -> bool:
+        if self.overflow == "drop":
+            with self._lock:
+                self._stats["dropped"] += 1
+            logger.warning("Chat message queue full; dropped message %s", doc.get("_id"))
+            return False
+
+        with self._lock:
+            self._stats["spilled"] += 1
+        self.get_collection().insert_one(doc)
+        with self._lock:
+            self._stats["written"] += 1
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until every queued document has been written. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._worker is None or self._worker_pid != os.getpid():
+            return
+        if not self.flush(timeout):
+            logger.warning("Chat message writer closed with %d messages unwritten", self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            "depth": self._queue.qsize(),
+            "capacity": self.max_queue,
+            "pending": self._pending,
+            "overflow": self.overflow,
+            "last_error": self.last_error,
+        })
+        return stats
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork, so each gunicorn worker starts its own writer thread.
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pending = 0
+            self._worker = threading.Thread(
+                target=self._run,
+                name="chat-message-writer",
+                daemon=True,
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _collect(self) -> List[dict]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._insert(batch)
+            except Exception:
+                logger.exception("Chat message writer failed a batch of %d", len(batch))
+            finally:
+                with self._idle:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+    def _insert(self, batch: List[dict], retries: int = 1) -> None:
+        written, failed = len(batch), 0
+        try:
+            self.get_collection().insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # With client-side _ids a duplicate key means an earlier attempt already landed.
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+            failed = len(errors)
+            written -= failed
+            if errors:
+                self.last_error = errors[0].get("errmsg")
+        except PyMongoError as e:
+            self.last_error = str(e)
+            if retries > 0:
+                time.sleep(0.5)
+                return self._insert(batch, retries - 1)
+            logger.error("Chat message writer dropped %d messages: %s", len(batch), e)
+            written, failed = 0, len(batch)
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["written"] += written
+            self._stats["failed"] += failed
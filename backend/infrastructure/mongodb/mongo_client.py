@@ -1,12 +1,161 @@
-from pymongo import MongoClient
+import atexit
+import os
+import threading
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import WaitQueueTimeoutError
 from flask import current_app, g
 
+EXTENSION_KEY = "mongo"
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Counts connection-pool events so pool pressure can be inspected per worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "checkout_failed": 0,
+            "pool_cleared": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "requests_pool_timeout": 0,
+        }
+
+    def count(self, key: str, by: int = 1) -> None:
+        with self._lock:
+            self.counts[key] += by
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.count("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.count("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.count("closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.count("checkout_failed")
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.counts["checked_out"] += 1
+            self.counts["in_use"] += 1
+            self.counts["max_in_use"] = max(self.counts["max_in_use"], self.counts["in_use"])
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.counts["checked_in"] += 1
+            self.counts["in_use"] -= 1
+
+
+class MongoClientManager:
+    """
+    One pooled MongoClient per worker process.
+
+    The client is created lazily and re-created when the pid changes, so a
+    client inherited from a gunicorn --preload master (whose sockets and
+    monitor threads belong to the parent) is never used in a worker. It is
+    closed at interpreter exit; the per-request database handle is released
+    when the app context tears down.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_pid = None
+        self.stats_listener = PoolStats()
+        self.uri = None
+        self.db_name = None
+        self.client_options = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.uri = app.config["MONGO_URI"]
+        self.db_name = app.config["MONGO_DB_NAME"]
+        self.client_options = {
+            "maxPoolSize": app.config.get("MONGO_MAX_POOL_SIZE", 20),
+            "minPoolSize": app.config.get("MONGO_MIN_POOL_SIZE", 0),
+            "maxIdleTimeMS": app.config.get("MONGO_MAX_IDLE_TIME_MS", 300000),
+            "waitQueueTimeoutMS": app.config.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000),
+            "serverSelectionTimeoutMS": app.config.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        }
+        app.extensions[EXTENSION_KEY] = self
+        app.teardown_appcontext(self.teardown)
+        atexit.register(self.close)
+
+    def teardown(self, exc) -> None:
+        # The pooled client outlives the request; only the handle cached on g goes.
+        g.pop("mongo_db", None)
+        if isinstance(exc, WaitQueueTimeoutError):
+            self.stats_listener.count("requests_pool_timeout")
+
+    @property
+    def client(self) -> MongoClient:
+        pid = os.getpid()
+        if self._client is None or self._client_pid != pid:
+            with self._lock:
+                if self._client is None or self._client_pid != pid:
+                    # Never close an inherited client here; it still belongs to the parent.
+                    self._client = MongoClient(
+                        self.uri,
+                        event_listeners=[self.stats_listener],
+                        **self.client_options,
+                    )
+                    self._client_pid = pid
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None and self._client_pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._client_pid = None
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "connected": self._client is not None and self._client_pid == os.getpid(),
+            "max_pool_size": self.client_options.get("maxPoolSize"),
+            "min_pool_size": self.client_options.get("minPoolSize"),
+            **self.stats_listener.snapshot(),
+        }
+
+
+def get_mongo_manager() -> MongoClientManager:
+    return current_app.extensions[EXTENSION_KEY]
+
+
 def get_mongo_db():
-    if "mongo_client" not in g:
-        g.mongo_client = MongoClient(
-            current_app.config["MONGO_URI"],
-            maxPoolSize=5,      
-            minPoolSize=1,
-        )
-
-    return g.mongo_client[current_app.config["MONGO_DB_NAME"]]
+    if "mongo_db" not in g:
+        g.mongo_db = get_mongo_manager().db
+    return g.mongo_db
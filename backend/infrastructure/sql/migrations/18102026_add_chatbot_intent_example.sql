@@ -0,0 +1,14 @@
+-- Per-organisation intent examples used alongside the global intent index.
+-- Run this for existing databases created before chatbot_intent_example existed.
+
+CREATE TABLE IF NOT EXISTS chatbot_intent_example (
+    intent_example_id INT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    organisation_id INT NOT NULL,
+    intent VARCHAR(50) NOT NULL,
+    text VARCHAR(255) NOT NULL,
+    embedding BYTEA, -- float16 sentence embedding, NULL until encoded
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (organisation_id) REFERENCES organisation(organisation_id) ON DELETE CASCADE,
+    CONSTRAINT uq_intent_example_org_text UNIQUE (organisation_id, text)
+);
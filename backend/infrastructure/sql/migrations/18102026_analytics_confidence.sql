@@ -0,0 +1,5 @@
+-- Intent-confidence histogram folded in by the analytics rollup.
+-- Run this for existing databases after 18102026_analytics_latency.sql.
+
+ALTER TABLE analytics
+    ADD COLUMN IF NOT EXISTS confidence_histogram TEXT; -- JSON user-message counts per 0.05 intent-confidence bin
@@ -0,0 +1,5 @@
+-- Reply latency histograms folded in by the analytics rollup.
+-- Run this for existing databases after 18102026_analytics_rollups.sql.
+
+ALTER TABLE analytics
+    ADD COLUMN IF NOT EXISTS latency_histogram TEXT; -- JSON per-stage / per-intent reply latency histograms
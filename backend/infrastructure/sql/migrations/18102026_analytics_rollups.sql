@@ -0,0 +1,15 @@
+-- Columns and watermark table for the chatMessages -> analytics rollup.
+-- Run this for existing databases created before the rollup existed.
+
+ALTER TABLE analytics
+    ADD COLUMN IF NOT EXISTS user_messages INT DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS hourly_counts TEXT, -- JSON list of 24 user-message counts per UTC hour
+    ADD COLUMN IF NOT EXISTS user_sketch BYTEA, -- HyperLogLog of senderUserId
+    ADD COLUMN IF NOT EXISTS session_sketch BYTEA, -- HyperLogLog of sessionId
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_message_id VARCHAR(24), -- chatMessages _id watermark
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,11 @@
+-- Platform-wide per-day usage kept by the analytics rollup for the sysadmin dashboard.
+-- Run this for existing databases after 18102026_analytics_rollups.sql.
+-- The next rollup run backfills it from raw messages up to its watermark.
+
+CREATE TABLE IF NOT EXISTS platform_usage_day (
+    date DATE PRIMARY KEY,
+    messages INT NOT NULL DEFAULT 0,
+    sessions INT NOT NULL DEFAULT 0,
+    session_sketch BYTEA, -- HyperLogLog of sessionId
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -3,7 +3,10 @@
 -- =========================
 DROP TABLE IF EXISTS landing_image CASCADE;
 DROP TABLE IF EXISTS featured_video CASCADE;
+DROP TABLE IF EXISTS analytics_rollup_state CASCADE;
+DROP TABLE IF EXISTS platform_usage_day CASCADE;
 DROP TABLE IF EXISTS analytics CASCADE;
+DROP TABLE IF EXISTS chatbot_intent_example CASCADE;
 DROP TABLE IF EXISTS chatbot_quick_reply CASCADE;
 DROP TABLE IF EXISTS chatbot_template CASCADE;
 DROP TABLE IF EXISTS chatbot CASCADE;
@@ -297,6 +300,21 @@ CREATE TABLE chatbot_quick_reply (
     FOREIGN KEY (organisation_id) REFERENCES organisation(organisation_id)
 );
 
+-- =========================
+-- chatbot intent examples (per-org training utterances)
+-- =========================
+CREATE TABLE chatbot_intent_example (
+    intent_example_id INT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    organisation_id INT NOT NULL,
+    intent VARCHAR(50) NOT NULL,
+    text VARCHAR(255) NOT NULL,
+    embedding BYTEA, -- float16 sentence embedding, NULL until encoded
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (organisation_id) REFERENCES organisation(organisation_id) ON DELETE CASCADE,
+    UNIQUE (organisation_id, text)
+);
+
 -- =========================
 -- analytics
 -- =========================
@@ -308,11 +326,32 @@ CREATE TABLE analytics (
     avg_response_time REAL DEFAULT 0,
     user_satisfaction REAL DEFAULT 0,
     peak_hour INT,
-    top_intents TEXT,
+    top_intents TEXT, -- JSON {intent: user messages}
+    user_messages INT DEFAULT 0,
+    hourly_counts TEXT, -- JSON list of 24 user-message counts per UTC hour
+    user_sketch BYTEA, -- HyperLogLog of senderUserId
+    session_sketch BYTEA, -- HyperLogLog of sessionId
+    latency_histogram TEXT, -- JSON per-stage / per-intent reply latency histograms
+    confidence_histogram TEXT, -- JSON user-message counts per 0.05 intent-confidence bin
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (bot_id) REFERENCES chatbot(bot_id),
     UNIQUE (bot_id, date)
 );
 
+CREATE TABLE platform_usage_day (
+    date DATE PRIMARY KEY,
+    messages INT NOT NULL DEFAULT 0,
+    sessions INT NOT NULL DEFAULT 0,
+    session_sketch BYTEA, -- HyperLogLog of sessionId
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE analytics_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_message_id VARCHAR(24), -- chatMessages _id watermark
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =========================
 -- featured video
 -- =========================
@@ -1,6 +1,9 @@
 -- clear tables
 TRUNCATE TABLE
+  analytics_rollup_state,
+  platform_usage_day,
   analytics,
+  chatbot_intent_example,
   chatbot_quick_reply,
   chatbot_template,
   chatbot,
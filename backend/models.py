@@ -285,6 +285,26 @@ class ChatbotQuickReply(db.Model):
     display_order = db.Column(db.Integer, nullable=False, default=0)
 
 
+class ChatbotIntentExample(db.Model):
+    __tablename__ = "chatbot_intent_example"
+
+    intent_example_id = db.Column(db.Integer, primary_key=True)
+    organisation_id = db.Column(
+        db.Integer,
+        db.ForeignKey("organisation.organisation_id", ondelete="CASCADE"),
+        nullable=False
+    )
+    intent = db.Column(db.String(50), nullable=False)
+    text = db.Column(db.String(255), nullable=False)
+    embedding = db.Column(db.LargeBinary)  # float16 bytes, NULL until encoded
+    created_at = db.Column(db.DateTime, server_default=func.now())
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint("organisation_id", "text", name="uq_intent_example_org_text"),
+    )
+
+
 class Analytics(db.Model):
     __tablename__ = "analytics"
 
@@ -295,12 +315,38 @@ class Analytics(db.Model):
     avg_response_time = db.Column(db.Float, default=0)
     user_satisfaction = db.Column(db.Float, default=0)
     peak_hour = db.Column(db.Integer)
-    top_intents = db.Column(db.Text)
+    top_intents = db.Column(db.Text)  # JSON {intent: user messages}, most frequent first
+
+    # Filled by the chatMessages rollup (application/analytics_rollup.py)
+    user_messages = db.Column(db.Integer, default=0)
+    hourly_counts = db.Column(db.Text)  # JSON list of 24 user-message counts per UTC hour
+    user_sketch = db.Column(db.LargeBinary)  # HyperLogLog of senderUserId
+    session_sketch = db.Column(db.LargeBinary)  # HyperLogLog of sessionId (sessions with a user message)
+    confidence_histogram = db.Column(db.Text)  # JSON list of user-message counts per 0.05 intent-confidence bin
+    latency_histogram = db.Column(db.Text)  # JSON LatencySummary of bot reply timings; avg_response_time is its mean (ms)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         db.UniqueConstraint("bot_id", "date", name="uq_analytics_bot_date"),
     )
 
+class PlatformUsageDay(db.Model):
+    __tablename__ = "platform_usage_day"
+
+    # Platform-wide totals per UTC day, filled by the chatMessages rollup
+    date = db.Column(db.Date, primary_key=True)
+    messages = db.Column(db.Integer, nullable=False, default=0)
+    sessions = db.Column(db.Integer, nullable=False, default=0)  # estimate from session_sketch
+    session_sketch = db.Column(db.LargeBinary)  # HyperLogLog of sessionId (all messages)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+class AnalyticsRollupState(db.Model):
+    __tablename__ = "analytics_rollup_state"
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_message_id = db.Column(db.String(24))  # chatMessages _id up to which rows are folded in
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
 class Invitation(db.Model):
     __tablename__ = "invitation"
 
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify, Response, stream_with_context
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash
 from sqlalchemy.exc import IntegrityError
 from backend.application.invitation_service import (
@@ -9,19 +9,13 @@ from backend.application.invitation_service import (
 from backend.application.user_profile_service import UserProfileService
 from backend.application.notification_service import NotificationService
 from backend.application.chat_history_service import ChatHistoryService
-from backend.application.ai.chatbot_service import ChatbotService
-from backend.application.ai.intent_service_embed import EmbeddingIntentService
-from backend.application.ai.template_engine import TemplateEngine
+from backend.application.chat_analytics_service import ChatAnalyticsService, parse_range
+from backend.application.ai.chatbot_registry import get_chatbot_service
 from backend.application.ai.speech_to_text import transcribe_audio
-from backend.application.chat_service import ChatMessageService
-from backend.data_access.ai.company_profile_repo import CompanyProfileRepository
-from backend.data_access.ai.chatbot_repo import ChatbotRepository
-from backend.data_access.ai.personality_repo import PersonalityRepository
-from backend.data_access.ai.template_repo import TemplateRepository
-from backend.data_access.ai.quick_reply_repo import QuickReplyRepository
 from backend.data_access.Users.users import UserRepository
 from backend.data_access.Notifications.notifications import NotificationRepository
 from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
+from backend.data_access.Analytics.analytics import AnalyticsRepository
 from backend.infrastructure.mongodb.mongo_client import get_mongo_db
 
 operator_bp = Blueprint("operator", __name__, url_prefix="/api/operator")
@@ -33,28 +27,6 @@ notification_repo = NotificationRepository()
 notification_service = NotificationService(notification_repo, user_repo)
 profile_service = UserProfileService(user_repo, notification_service)
 
-def _build_chatbot_service() -> ChatbotService:
-    company_repo = CompanyProfileRepository()
-    template_repo = TemplateRepository()
-    quick_reply_repo = QuickReplyRepository()
-    template_engine = TemplateEngine()
-    intent_service = EmbeddingIntentService()
-    chatbot_repo = ChatbotRepository()
-    personality_repo = PersonalityRepository()
-    mongo_repo = ChatMessageRepository(get_mongo_db())
-    chat_message_service = ChatMessageService(mongo_repo)
-
-    return ChatbotService(
-        intent_service=intent_service,
-        company_repository=company_repo,
-        template_repository=template_repo,
-        template_engine=template_engine,
-        chatbot_repository=chatbot_repo,
-        personality_repository=personality_repo,
-        chat_message_service=chat_message_service,
-        quick_reply_repository=quick_reply_repo,
-    )
-
 # =================================
 # Invitation & registration
 
@@ -185,15 +157,22 @@ def get_operator_chat_history():
         ChatMessageRepository(get_mongo_db())
     )
 
-    # Operators only see recent messages (no pagination UI yet)
-    _, rows = service.get_chat_history(
-        organisation_id=organisation_id,
-        keyword=q or None,
-        date_from=from_dt,
-        date_to=to_dt,
-        page=1,
-        page_size=50,
-    )
+    # Operators see 50 messages per page (best keyword matches first); more via next_cursor. No total is computed.
+    try:
+        result = service.get_chat_history_page(
+            organisation_id=organisation_id,
+            keyword=q or None,
+            date_from=from_dt,
+            date_to=to_dt,
+            cursor=request.args.get("cursor"),
+            direction=(request.args.get("direction") or "next").strip().lower(),
+            page_size=50,
+            count="none",
+            sort=(request.args.get("sort") or "relevance").strip().lower(),
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    rows = result["messages"]
 
     messages = []
     for r in rows:
@@ -207,10 +186,13 @@ def get_operator_chat_history():
             "sender_name": r.get("senderName") or "Guest",
             "message": r.get("message"),
             "timestamp": ts.isoformat() if ts else None,
+            "score": r.get("_score"),
         })
 
     return jsonify({
         "ok": True,
+        "next_cursor": result["next_cursor"],
+        "prev_cursor": result["prev_cursor"],
         "messages": messages
     }), 200
 
@@ -223,74 +205,19 @@ def get_operator_chatbot_analytics():
     if not organisation_id:
         return {"error": "organisation_id is required"}, 400
 
-    date_from = request.args.get("from")
-    date_to = request.args.get("to")
-
-    if date_to:
-        end = datetime.strptime(date_to, "%Y-%m-%d")
-    else:
-        end = datetime.utcnow()
-
-    if date_from:
-        start = datetime.strptime(date_from, "%Y-%m-%d")
-    else:
-        start = end - timedelta(days=6)
-
-    end = end.replace(hour=23, minute=59, second=59)
-
-    repo = ChatMessageRepository(get_mongo_db())
-
-    query = {
-        "organisationId": organisation_id,
-        "sender": "user",
-        "timestamp": {"$gte": start, "$lte": end},
-    }
-
-    rows = repo.collection.find(query)
-
-    daily_counts = {}
-    hourly_counts = {}
-    unique_users = set()
-    unique_sessions = set()
-
-    for r in rows:
-        ts = r.get("timestamp")
-        if not ts:
-            continue
-
-        day = ts.date()
-        daily_counts[day] = daily_counts.get(day, 0) + 1
-
-        hour = ts.hour
-        hourly_counts[hour] = hourly_counts.get(hour, 0) + 1
-
-        if r.get("senderUserId"):
-            unique_users.add(r.get("senderUserId"))
-        elif r.get("sessionId"):
-            unique_sessions.add(r.get("sessionId"))
-
-    daily_list = []
-    cursor = start.date()
-    while cursor <= end.date():
-        daily_list.append({
-            "date": cursor.strftime("%d-%m-%Y"),
-            "day": cursor.strftime("%A"),
-            "count": daily_counts.get(cursor, 0),
-        })
-        cursor += timedelta(days=1)
+    try:
+        start, end = parse_range(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        return {"error": "from/to must be YYYY-MM-DD"}, 400
 
-    most_active_hour = max(hourly_counts, key=hourly_counts.get) if hourly_counts else None
+    service = ChatAnalyticsService(
+        ChatMessageRepository(get_mongo_db()),
+        AnalyticsRepository(),
+    )
 
     return jsonify({
         "ok": True,
-        "daily_chats": daily_list,
-        "total_chats": sum(daily_counts.values()),
-        "unique_users": len(unique_users) if unique_users else len(unique_sessions),
-        "most_active_hour": {
-            "hour_24": most_active_hour,
-            "label": None if most_active_hour is None else datetime.strptime(str(most_active_hour), "%H").strftime("%I %p"),
-            "count": hourly_counts.get(most_active_hour, 0) if most_active_hour is not None else 0,
-        }
+        **service.get_usage(organisation_id, start, end),
     }), 200
 
 # export chat history as CSV
@@ -303,6 +230,7 @@ def export_operator_chat_history_csv():
     q = (request.args.get("q") or "").strip()
     date_from = request.args.get("from")
     date_to = request.args.get("to")
+    sort = (request.args.get("sort") or "relevance").strip().lower()
 
     from_dt = None
     to_dt = None
@@ -326,15 +254,19 @@ def export_operator_chat_history_csv():
 
     filename = f"chat_export_operator_{organisation_id}.csv"
 
+    try:
+        rows = service.stream_csv_export(
+            organisation_id=organisation_id,
+            keyword=q or None,
+            date_from=from_dt,
+            date_to=to_dt,
+            sort=sort,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
     return Response(
-        stream_with_context(
-            service.stream_csv_export(
-                organisation_id=organisation_id,
-                keyword=q or None,
-                date_from=from_dt,
-                date_to=to_dt,
-            )
-        ),
+        stream_with_context(rows),
         mimetype="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
@@ -385,7 +317,7 @@ def chat_voice():
         else:
             user_id = None
 
-        chatbot_service = _build_chatbot_service()
+        chatbot_service = get_chatbot_service()
         result = chatbot_service.chat(
             company_id=organisation_id,
             message=transcript,
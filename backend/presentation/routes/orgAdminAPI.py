@@ -1,26 +1,22 @@
 from backend import db
 from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import cross_origin
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from sqlalchemy.exc import IntegrityError
 from backend.models import Organisation, Chatbot, Personality, Subscription, AppUser, OrgRole, Invitation, ChatbotQuickReply
 from backend.application.user_service import UserService
 from backend.application.user_profile_service import UserProfileService
 from backend.application.notification_service import NotificationService
 from backend.application.chat_history_service import ChatHistoryService
-from backend.application.ai.chatbot_service import ChatbotService
-from backend.application.ai.intent_service_embed import EmbeddingIntentService
-from backend.application.ai.template_engine import TemplateEngine
+from backend.application.chat_analytics_service import ChatAnalyticsService, parse_range
+from backend.application.ai.chatbot_registry import get_chatbot_service, get_registry
 from backend.application.ai.speech_to_text import transcribe_audio
-from backend.application.chat_service import ChatMessageService
-from backend.data_access.ai.company_profile_repo import CompanyProfileRepository
-from backend.data_access.ai.chatbot_repo import ChatbotRepository
-from backend.data_access.ai.personality_repo import PersonalityRepository
-from backend.data_access.ai.template_repo import TemplateRepository
-from backend.data_access.ai.quick_reply_repo import QuickReplyRepository
+from backend.application.ai.intent_training_data import INTENT_EXAMPLES
+from backend.data_access.ai.intent_example_repo import IntentExampleRepository
 from backend.data_access.Users.users import UserRepository
 from backend.data_access.Notifications.notifications import NotificationRepository
 from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
+from backend.data_access.Analytics.analytics import AnalyticsRepository
 from backend.infrastructure.mongodb.mongo_client import get_mongo_db
 
 org_admin_bp = Blueprint("org_admin", __name__, url_prefix="/api/org-admin")
@@ -35,28 +31,6 @@ user_service = UserService(user_repo)
 profile_service = UserProfileService(user_repo, notification_service)
 
 # Helpers
-def _build_chatbot_service() -> ChatbotService:
-    company_repo = CompanyProfileRepository()
-    template_repo = TemplateRepository()
-    quick_reply_repo = QuickReplyRepository()
-    template_engine = TemplateEngine()
-    intent_service = EmbeddingIntentService()
-    chatbot_repo = ChatbotRepository()
-    personality_repo = PersonalityRepository()
-    mongo_repo = ChatMessageRepository(get_mongo_db())
-    chat_message_service = ChatMessageService(mongo_repo)
-
-    return ChatbotService(
-        intent_service=intent_service,
-        company_repository=company_repo,
-        template_repository=template_repo,
-        template_engine=template_engine,
-        chatbot_repository=chatbot_repo,
-        personality_repository=personality_repo,
-        chat_message_service=chat_message_service,
-        quick_reply_repository=quick_reply_repo,
-    )
-
 def _get_or_create_chatbot(organisation_id: int) -> Chatbot | None:
     org = Organisation.query.get(organisation_id)
     if not org:
@@ -72,6 +46,7 @@ def _get_or_create_chatbot(organisation_id: int) -> Chatbot | None:
     )
     db.session.add(chatbot)
     db.session.commit()
+    get_registry().invalidate_organisation(organisation_id)
     return chatbot
 
 
@@ -459,6 +434,10 @@ def get_chat_history():
     date_to = request.args.get("to")
     page = request.args.get("page", type=int) or 1
     page_size = request.args.get("page_size", type=int) or 20
+    cursor = request.args.get("cursor")
+    direction = (request.args.get("direction") or "next").strip().lower()
+    count_mode = (request.args.get("count") or "cached").strip().lower()
+    sort = (request.args.get("sort") or "relevance").strip().lower()
 
     from_dt = None
     to_dt = None
@@ -480,14 +459,44 @@ def get_chat_history():
         ChatMessageRepository(get_mongo_db())
     )
 
-    total, rows = service.get_chat_history(
-        organisation_id=organisation_id,
-        keyword=q or None,
-        date_from=from_dt,
-        date_to=to_dt,
-        page=page,
-        page_size=page_size,
-    )
+    next_cursor = prev_cursor = None
+    total_is_lower_bound = False
+
+    if page > 1 and not cursor:
+        # Offset fallback for clients that jump straight to a page number.
+        try:
+            total, rows = service.get_chat_history(
+                organisation_id=organisation_id,
+                keyword=q or None,
+                date_from=from_dt,
+                date_to=to_dt,
+                page=page,
+                page_size=page_size,
+                sort=sort,
+            )
+        except ValueError as e:
+            return {"error": str(e)}, 400
+    else:
+        try:
+            result = service.get_chat_history_page(
+                organisation_id=organisation_id,
+                keyword=q or None,
+                date_from=from_dt,
+                date_to=to_dt,
+                cursor=cursor,
+                direction=direction,
+                page_size=page_size,
+                count=count_mode,
+                sort=sort,
+            )
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        rows = result["messages"]
+        total = result["total"]
+        total_is_lower_bound = result["total_is_lower_bound"]
+        next_cursor = result["next_cursor"]
+        prev_cursor = result["prev_cursor"]
 
     messages = []
     for r in rows:
@@ -501,13 +510,17 @@ def get_chat_history():
             "sender_name": r.get("senderName") or "Guest",
             "message": r.get("message"),
             "timestamp": ts.isoformat() if ts else None,
+            "score": r.get("_score"),
         })
 
     return jsonify({
         "ok": True,
         "total": total,
+        "total_is_lower_bound": total_is_lower_bound,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
         "messages": messages,
     }), 200
 
@@ -555,7 +568,7 @@ def chat_voice():
         else:
             user_id = None
 
-        chatbot_service = _build_chatbot_service()
+        chatbot_service = get_chatbot_service()
         result = chatbot_service.chat(
             company_id=organisation_id,
             message=transcript,
@@ -627,6 +640,7 @@ def update_chatbot_settings():
         chatbot.allow_emojis = data.get("allow_emojis")
 
     db.session.commit()
+    get_registry().invalidate_organisation(organisation_id)
 
     notification_service.notify_organisation(
         organisation_id=organisation_id,
@@ -657,7 +671,7 @@ def get_org_quick_replies():
     if not organisation_id:
         return {"error": "organisation_id is required"}, 400
 
-    company_repo = CompanyProfileRepository()
+    company_repo = get_registry().company_repository
     company = company_repo.get_company_profile(organisation_id)
     if not company:
         return {"error": "Organisation not found"}, 404
@@ -725,7 +739,7 @@ def update_org_quick_replies():
     if len(cleaned) > 10:
         return {"error": "max 10 quick replies"}, 400
 
-    company_repo = CompanyProfileRepository()
+    company_repo = get_registry().company_repository
     company = company_repo.get_company_profile(organisation_id)
     if not company:
         return {"error": "Organisation not found"}, 404
@@ -762,6 +776,8 @@ def update_org_quick_replies():
 
     db.session.commit()
 
+    get_registry().refresh_quick_replies(cleaned)
+
     notification_service.notify_organisation(
         organisation_id=organisation_id,
         title="Chatbot quick replies updated",
@@ -775,6 +791,70 @@ def update_org_quick_replies():
         "quick_replies": cleaned,
     }), 200
 
+
+@org_admin_bp.get("/intent-examples")
+def get_org_intent_examples():
+    organisation_id = request.args.get("organisation_id", type=int)
+    if not organisation_id:
+        return {"error": "organisation_id is required"}, 400
+
+    rows = IntentExampleRepository().list_by_organisation(organisation_id)
+
+    return jsonify({
+        "ok": True,
+        "intents": sorted(INTENT_EXAMPLES.keys()),
+        "examples": [{"intent": r.intent, "text": r.text} for r in rows],
+    }), 200
+
+
+@org_admin_bp.put("/intent-examples")
+def update_org_intent_examples():
+    organisation_id = request.args.get("organisation_id", type=int)
+    if not organisation_id:
+        return {"error": "organisation_id is required"}, 400
+
+    data = request.get_json() or {}
+    examples = data.get("examples")
+
+    if not isinstance(examples, list):
+        return {"error": "examples must be a list of {intent, text}"}, 400
+
+    if not Organisation.query.get(organisation_id):
+        return {"error": "Organisation not found"}, 404
+
+    cleaned: list[tuple[str, str]] = []
+    seen: set[str] = set()
+    for ex in examples:
+        if not isinstance(ex, dict):
+            return {"error": "examples must be a list of {intent, text}"}, 400
+        intent = (ex.get("intent") or "").strip() if isinstance(ex.get("intent"), str) else ""
+        text = (ex.get("text") or "").strip() if isinstance(ex.get("text"), str) else ""
+        if not text:
+            continue
+        if intent not in INTENT_EXAMPLES:
+            return {"error": f"Unknown intent: {intent}"}, 400
+        if len(text) > 255:
+            return {"error": "each example must be <= 255 characters"}, 400
+        if text not in seen:
+            seen.add(text)
+            cleaned.append((intent, text))
+
+    if len(cleaned) > 200:
+        return {"error": "max 200 intent examples"}, 400
+
+    repo = IntentExampleRepository()
+    repo.replace_for_organisation(organisation_id, cleaned)
+
+    # Only new or edited texts are encoded; the rest keep their stored embedding.
+    # If encoding fails the examples stay saved and are encoded on the next index load.
+    encoded = get_registry().refresh_org_intents(organisation_id)
+
+    return jsonify({
+        "ok": True,
+        "examples": [{"intent": i, "text": t} for i, t in cleaned],
+        "encoded": encoded,
+    }), 200
+
 @org_admin_bp.route("/analytics", methods=["GET", "OPTIONS"])
 @cross_origin()
 def get_chatbot_analytics():
@@ -782,73 +862,73 @@ def get_chatbot_analytics():
     if not organisation_id:
         return {"error": "organisation_id is required"}, 400
 
-    date_from = request.args.get("from")
-    date_to = request.args.get("to")
-
     # Default range: last 7 days (UTC)
     try:
-        if date_to:
-            end = datetime.strptime(date_to, "%Y-%m-%d")
-        else:
-            end = datetime.utcnow()
-
-        if date_from:
-            start = datetime.strptime(date_from, "%Y-%m-%d")
-        else:
-            start = end - timedelta(days=6)
+        start, end = parse_range(request.args.get("from"), request.args.get("to"))
     except ValueError:
         return {"error": "from/to must be YYYY-MM-DD"}, 400
 
-    end = end.replace(hour=23, minute=59, second=59)
-
-    repo = ChatMessageRepository(get_mongo_db())
+    service = ChatAnalyticsService(
+        ChatMessageRepository(get_mongo_db()),
+        AnalyticsRepository(),
+    )
 
-    query = {
-        "organisationId": organisation_id,
-        "sender": "user",
-        "timestamp": {
-            "$gte": start,
-            "$lte": end,
+    return jsonify({
+        "ok": True,
+        "range": {
+            "from": start.strftime("%Y-%m-%d"),
+            "to": end.strftime("%Y-%m-%d"),
+            "timezone": "UTC",
         },
-    }
-
-    rows = repo.collection.find(query)
+        **service.get_usage(organisation_id, start, end),
+    }), 200
 
-    daily_counts = {}
-    hourly_counts = {}
-    unique_users = set()
-    unique_sessions = set()
+@org_admin_bp.get("/analytics/latency")
+def get_chatbot_latency():
+    organisation_id = request.args.get("organisation_id", type=int)
+    if not organisation_id:
+        return {"error": "organisation_id is required"}, 400
 
-    for r in rows:
-        ts = r.get("timestamp")
-        if not ts:
-            continue
+    try:
+        start, end = parse_range(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        return {"error": "from/to must be YYYY-MM-DD"}, 400
 
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
+    service = ChatAnalyticsService(
+        ChatMessageRepository(get_mongo_db()),
+        AnalyticsRepository(),
+    )
 
-        day = ts.date()
-        daily_counts[day] = daily_counts.get(day, 0) + 1
+    return jsonify({
+        "ok": True,
+        "range": {
+            "from": start.strftime("%Y-%m-%d"),
+            "to": end.strftime("%Y-%m-%d"),
+            "timezone": "UTC",
+        },
+        **service.get_latency(organisation_id, start, end),
+    }), 200
 
-        hour = ts.hour
-        hourly_counts[hour] = hourly_counts.get(hour, 0) + 1
+@org_admin_bp.get("/analytics/intents")
+def get_chatbot_intent_stats():
+    organisation_id = request.args.get("organisation_id", type=int)
+    if not organisation_id:
+        return {"error": "organisation_id is required"}, 400
 
-        if r.get("senderUserId"):
-            unique_users.add(r.get("senderUserId"))
-        elif r.get("sessionId"):
-            unique_sessions.add(r.get("sessionId"))
+    try:
+        start, end = parse_range(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        return {"error": "from/to must be YYYY-MM-DD"}, 400
 
-    daily_list = []
-    cursor = start.date()
-    while cursor <= end.date():
-        daily_list.append({
-            "date": cursor.strftime("%d-%m-%Y"),
-            "day": cursor.strftime("%A"),
-            "count": daily_counts.get(cursor, 0),
-        })
-        cursor += timedelta(days=1)
+    threshold = request.args.get("threshold", type=float)
+    if threshold is not None and not 0 <= threshold <= 1:
+        return {"error": "threshold must be between 0 and 1"}, 400
 
-    most_active_hour = max(hourly_counts, key=hourly_counts.get) if hourly_counts else None
+    service = ChatAnalyticsService(
+        ChatMessageRepository(get_mongo_db()),
+        AnalyticsRepository(),
+    )
+    kwargs = {} if threshold is None else {"low_confidence_threshold": threshold}
 
     return jsonify({
         "ok": True,
@@ -857,19 +937,7 @@ def get_chatbot_analytics():
             "to": end.strftime("%Y-%m-%d"),
             "timezone": "UTC",
         },
-        "daily_chats": daily_list,
-        "total_chats": sum(daily_counts.values()),
-        "unique_users": len(unique_users) if unique_users else len(unique_sessions),
-        "most_active_hour": {
-            "hour_24": most_active_hour,
-            "label": (
-                None if most_active_hour is None
-                else datetime.strptime(str(most_active_hour), "%H").strftime("%I %p")
-            ),
-            "count": hourly_counts.get(most_active_hour, 0)
-            if most_active_hour is not None
-            else 0,
-        },
+        **service.get_intent_stats(organisation_id, start, end, **kwargs),
     }), 200
 
 # export chat history as CSV
@@ -882,6 +950,7 @@ def export_chat_history_csv():
     q = (request.args.get("q") or "").strip()
     date_from = request.args.get("from")
     date_to = request.args.get("to")
+    sort = (request.args.get("sort") or "relevance").strip().lower()
 
     from_dt = None
     to_dt = None
@@ -905,15 +974,19 @@ def export_chat_history_csv():
 
     filename = f"chat_export_org_{organisation_id}.csv"
 
+    try:
+        rows = service.stream_csv_export(
+            organisation_id=organisation_id,
+            keyword=q or None,
+            date_from=from_dt,
+            date_to=to_dt,
+            sort=sort,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
     return Response(
-        stream_with_context(
-            service.stream_csv_export(
-                organisation_id=organisation_id,
-                keyword=q or None,
-                date_from=from_dt,
-                date_to=to_dt,
-            )
-        ),
+        stream_with_context(rows),
         mimetype="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
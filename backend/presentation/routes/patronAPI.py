@@ -1,17 +1,7 @@
 from flask import Blueprint, request, jsonify
 from backend.models import Organisation, Chatbot, AppUser
-from backend.application.ai.chatbot_service import ChatbotService
-from backend.application.ai.intent_service_embed import EmbeddingIntentService
-from backend.application.ai.template_engine import TemplateEngine
+from backend.application.ai.chatbot_registry import get_chatbot_service, get_registry
 from backend.application.ai.speech_to_text import transcribe_audio
-from backend.application.chat_service import ChatMessageService
-from backend.data_access.ai.company_profile_repo import CompanyProfileRepository
-from backend.data_access.ai.chatbot_repo import ChatbotRepository
-from backend.data_access.ai.personality_repo import PersonalityRepository
-from backend.data_access.ai.template_repo import TemplateRepository
-from backend.data_access.ai.quick_reply_repo import QuickReplyRepository
-from backend.data_access.ChatMessages.chatMessages import ChatMessageRepository
-from backend.infrastructure.mongodb.mongo_client import get_mongo_db
 from backend import db
 
 patron_bp = Blueprint("patron", __name__)
@@ -27,28 +17,6 @@ def _require_patron():
 
     return user, None, None
 
-def _build_chatbot_service() -> ChatbotService:
-    company_repo = CompanyProfileRepository()
-    template_repo = TemplateRepository()
-    quick_reply_repo = QuickReplyRepository()
-    template_engine = TemplateEngine()
-    intent_service = EmbeddingIntentService()
-    chatbot_repo = ChatbotRepository()
-    personality_repo = PersonalityRepository()
-    mongo_repo = ChatMessageRepository(get_mongo_db())
-    chat_message_service = ChatMessageService(mongo_repo)
-
-    return ChatbotService(
-        intent_service=intent_service,
-        company_repository=company_repo,
-        template_repository=template_repo,
-        template_engine=template_engine,
-        chatbot_repository=chatbot_repo,
-        personality_repository=personality_repo,
-        chat_message_service=chat_message_service,
-        quick_reply_repository=quick_reply_repo,
-    )
-
 @patron_bp.get("/chat-directory")
 def chat_directory():
     user, error_response, status_code = _require_patron()
@@ -95,15 +63,15 @@ def patron_chat_welcome():
         return jsonify({"ok": False, "error": "company_id is required"}), 400
 
     try:
-        chatbot_repo = ChatbotRepository()
-        chatbot = chatbot_repo.get_by_organisation_id(company_id)
-        if not chatbot:
+        context = get_registry().chat_context(company_id)
+        if not context or not context.chatbot:
             return jsonify({"ok": False, "error": "Chatbot not found"}), 404
 
-        chatbot_service = _build_chatbot_service()
+        chatbot_service = get_chatbot_service()
         result = chatbot_service.welcome(
             company_id=company_id,
             session_id=session_id,
+            context=context,
         )
         return jsonify(result), 200
     except Exception as e:
@@ -125,17 +93,17 @@ def patron_chat():
         return jsonify({"ok": False, "error": "company_id and message are required"}), 400
 
     try:
-        chatbot_repo = ChatbotRepository()
-        chatbot = chatbot_repo.get_by_organisation_id(company_id)
-        if not chatbot:
+        context = get_registry().chat_context(company_id)
+        if not context or not context.chatbot:
             return jsonify({"ok": False, "error": "Chatbot not found"}), 404
 
-        chatbot_service = _build_chatbot_service()
+        chatbot_service = get_chatbot_service()
         result = chatbot_service.chat(
             company_id=company_id,
             message=message,
             session_id=session_id,
             user_id=user.user_id,
+            context=context,
         )
         return jsonify(result), 200
     except Exception as e:
@@ -177,7 +145,7 @@ def patron_chat_voice():
         return jsonify({"ok": False, "error": "No speech detected"}), 400
 
     try:
-        chatbot_service = _build_chatbot_service()
+        chatbot_service = get_chatbot_service()
         result = chatbot_service.chat(
             company_id=organisation_id,
             message=transcript,
@@ -3,12 +3,16 @@ from backend.models import Feedback, AppUser, Feature, FAQ, OrgRole, Organisatio
 from backend import db
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func, case
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from backend.application.notification_service import NotificationService
 from backend.data_access.Notifications.notifications import NotificationRepository
 from backend.data_access.Users.users import UserRepository
 from backend.application.user_profile_service import UserProfileService
 from backend.infrastructure.mongodb.mongo_client import get_mongo_db
+from backend.infrastructure.mongodb.indexes import explain_queries, missing_indexes
+from backend.application.ai.chatbot_registry import get_registry
+from backend.application.platform_usage_service import PlatformUsageService
+from backend.data_access.Analytics.analytics import AnalyticsRepository
 
 
 sysadmin_bp = Blueprint("sysadmin", __name__)
@@ -1201,6 +1205,35 @@ def update_subscription_features(subscription_id):
     }), 200
 
 
+@sysadmin_bp.get("/diagnostics/runtime")
+def diagnostics_runtime():
+    _, err = _require_sysadmin()
+    if err:
+        return err
+
+    # Per-worker numbers: each gunicorn worker keeps its own queues and caches.
+    return jsonify({"ok": True, **get_registry().runtime_stats()}), 200
+
+
+@sysadmin_bp.get("/diagnostics/mongo-indexes")
+def diagnostics_mongo_indexes():
+    _, err = _require_sysadmin()
+    if err:
+        return err
+
+    organisation_id = request.args.get("organisation_id", default=0, type=int)
+
+    dbm = get_mongo_db()
+    queries = explain_queries(dbm, organisation_id)
+
+    return jsonify({
+        "ok": True,
+        "missing_indexes": missing_indexes(dbm),
+        "collscans": [q["query"] for q in queries if q["collscan"]],
+        "queries": queries,
+    }), 200
+
+
 @sysadmin_bp.get("/dashboard/user-status")
 def dashboard_user_status():
     _, err = _require_sysadmin()
@@ -1236,73 +1269,34 @@ def dashboard_daily_usage():
     if metric not in ("messages", "sessions"):
         return jsonify({"ok": False, "error": "metric must be 'messages' or 'sessions'."}), 400
 
-    end_dt = datetime.now(timezone.utc)
-    start_dt = end_dt - timedelta(days=days - 1)
+    service = PlatformUsageService(get_mongo_db().chatMessages, AnalyticsRepository())
+    series = service.daily_series(days, metric)
 
-    dbm = get_mongo_db()
-    collection = dbm.chatMessages  
+    return jsonify({
+        "ok": True,
+        "metric": metric,
+        "series": series
+    }), 200
 
-    match_stage = {
-        "$match": {
-            "timestamp": {"$gte": start_dt}
-        }
-    }
 
-    if metric == "messages":
-        pipeline = [
-            match_stage,
-            {
-                "$group": {
-                    "_id": {
-                        "$dateToString": {
-                            "format": "%Y-%m-%d",
-                            "date": "$timestamp"
-                        }
-                    },
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id": 1}}
-        ]
-    else:  # sessions
-        pipeline = [
-            match_stage,
-            {"$match": {"sessionId": {"$ne": None}}},
-            {
-                "$group": {
-                    "_id": {
-                        "$dateToString": {
-                            "format": "%Y-%m-%d",
-                            "date": "$timestamp"
-                        }
-                    },
-                    "sessions": {"$addToSet": "$sessionId"}
-                }
-            },
-            {
-                "$project": {
-                    "count": {"$size": "$sessions"}
-                }
-            },
-            {"$sort": {"_id": 1}}
-        ]
+@sysadmin_bp.get("/dashboard/latency")
+def dashboard_latency():
+    _, err = _require_sysadmin()
+    if err:
+        return err
 
-    rows = list(collection.aggregate(pipeline))
-    counts_by_date = {r["_id"]: r["count"] for r in rows}
+    days = request.args.get("days", default=7, type=int)
+    limit = request.args.get("limit", default=20, type=int)
 
-    series = []
-    for i in range(days):
-        day = (start_dt + timedelta(days=i)).date()
-        day_str = str(day)
-        series.append({
-            "date": day_str,
-            "count": counts_by_date.get(day_str, 0)
-        })
+    if days < 1 or days > 31:
+        return jsonify({"ok": False, "error": "days must be between 1 and 31."}), 400
+
+    service = PlatformUsageService(get_mongo_db().chatMessages, AnalyticsRepository())
 
     return jsonify({
         "ok": True,
-        "metric": metric,
-        "series": series
+        "days": days,
+        "tenants": service.latency_by_tenant(days, max(limit, 1)),
     }), 200
 
 